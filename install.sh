@@ -13,8 +13,13 @@ INDEX_LOCATION=""
 INDEX_NAME="cosmic-local"
 
 FORCE=NO
+SYNC=NO
+ATOMIC=NO
+ROLLBACK=NO
+KEEP=2
 
 archive_url="https://github.com/raplonu/cosmic-center-index/archive/refs/heads/main.tar.gz"
+base_url="https://raw.githubusercontent.com/raplonu/cosmic-center-index/refs/heads/main"
 
 while [[ $# -gt 0 ]]; do
     case $1 in
@@ -36,6 +41,29 @@ while [[ $# -gt 0 ]]; do
             FORCE=YES
             shift # past argument
             ;;
+        -s|--sync)
+            SYNC=YES
+            shift # past argument
+            ;;
+        -a|--atomic)
+            ATOMIC=YES
+            shift # past argument
+            ;;
+        -k|--keep)
+            KEEP=$2
+            shift # past argument
+            shift # past value
+            ;;
+        -r|--rollback)
+            ATOMIC=YES
+            ROLLBACK=YES
+            shift # past argument
+            ;;
+        -u|--base-url)
+            base_url=$2
+            shift # past argument
+            shift # past value
+            ;;
         -p|--python)
             DEFAULT_PYTHON=$2
             shift # past argument
@@ -48,6 +76,11 @@ while [[ $# -gt 0 ]]; do
             echo "  -n, --index-name <name>       Set the name of the index (default: cosmic-local)"
             echo "  -i, --install                 Install conan (default: NO)"
             echo "  -f, --force                   Force the download of the index (default: NO)"
+            echo "  -s, --sync                    Only download the recipe files that changed, other files are kept (default: NO)"
+            echo "  -a, --atomic                  Update the index in a new snapshot and switch to it atomically (default: NO)"
+            echo "  -k, --keep <n>                Set the number of previous snapshots kept by --atomic (default: 2)"
+            echo "  -r, --rollback                Switch the index back to the previous snapshot"
+            echo "  -u, --base-url <url>          Set the url the index files are synchronised from (default: $base_url)"
             echo "  -p, --python <python>         Set the python executable to use (default: python3)"
             echo "  -h, --help                    Show this help"
             exit 0
@@ -92,24 +125,122 @@ fi
 ####################
 echo "Populating the index…"
 
-if [[ ! -d $INDEX_LOCATION ]] || [[ "$FORCE" == "YES" ]]; then
-    rm -rf $INDEX_LOCATION
-    echo "Downloading index to $INDEX_LOCATION"
-    # Download the repo archive and extract it to the index location
-    tmp_dir="$(mktemp -d)"
-    trap 'rm -rf "$tmp_dir"' EXIT
-
-    staging="$tmp_dir/staging"
-    mkdir -p "$staging"
-
-    # Stream + extract, don’t depend on repo-name folder; include dotfiles
+# Stream + extract the repo archive to $1, don’t depend on repo-name folder; include dotfiles
+download_index() {
+    mkdir -p "$1"
     curl -fsSL --retry 3 --retry-connrefused --connect-timeout 10 "$archive_url" \
-    | tar -xz -C "$staging" --strip-components=1 --no-same-owner
-
-    # Mirror to destination (preserve perms, include dotfiles, remove deleted files)
-    rsync -a --delete "$staging"/ "$INDEX_LOCATION"/
+    | tar -xz -C "$1" --strip-components=1 --no-same-owner
+}
+
+# Only fetch the recipe files of the index in $1 that differ from the published manifest.
+sync_index() {
+    [[ -f "$1/tools/index_sync.py" ]] \
+    && $DEFAULT_PYTHON "$1/tools/index_sync.py" --index-location "$1" --base-url "$base_url"
+}
+
+if [[ "$ATOMIC" == "YES" ]]; then
+    # $INDEX_LOCATION is a symlink to one of the complete snapshots in $snapshots_dir. Readers
+    # (conan) always see a whole index: new snapshots are built aside and the link is replaced
+    # with an atomic rename.
+    snapshots_dir="$INDEX_LOCATION.snapshots"
+    mkdir -p "$snapshots_dir"
+
+    command -v flock > /dev/null || { echo "--atomic requires flock"; exit 1; }
+
+    # Installers started while another one holds the lock wait for it and reuse its snapshot.
+    exec 9> "$INDEX_LOCATION.lock"
+    before_lock=$(readlink "$INDEX_LOCATION" || true)
+    existed_before_lock=NO
+    if [[ -e $INDEX_LOCATION ]]; then
+        existed_before_lock=YES
+    fi
+    flock 9
+
+    # Leftovers of interrupted runs.
+    rm -rf "$snapshots_dir"/.tmp-*
+
+    switch_to() {
+        ln -sfn "$snapshots_dir/$1" "$INDEX_LOCATION.tmp-link"
+        mv -Tf "$INDEX_LOCATION.tmp-link" "$INDEX_LOCATION"
+        echo "Index $INDEX_LOCATION now points to snapshot $1"
+    }
+
+    current=""
+    if [[ -L $INDEX_LOCATION ]]; then
+        current=$(basename "$(readlink "$INDEX_LOCATION")")
+    elif [[ -d $INDEX_LOCATION ]]; then
+        # Adopt an index installed without --atomic as the first snapshot.
+        current="$(date +%Y%m%dT%H%M%S)-legacy"
+        mv "$INDEX_LOCATION" "$snapshots_dir/$current"
+        switch_to "$current"
+    fi
+
+    if [[ "$ROLLBACK" == "YES" ]]; then
+        previous=$(ls -1 "$snapshots_dir" | sort | awk -v current="$current" '$0 == current { print last; exit } { last = $0 }')
+        if [[ -z $previous ]]; then
+            echo "No snapshot older than ${current:-<none>} to roll back to"
+            exit 1
+        fi
+        switch_to "$previous"
+    elif [[ "$existed_before_lock" == "NO" ]] && [[ -n $current ]]; then
+        echo "Index $INDEX_LOCATION was installed by a concurrent installer"
+    elif [[ -n $before_lock ]] && [[ "$before_lock" != "$(readlink "$INDEX_LOCATION")" ]]; then
+        echo "Index $INDEX_LOCATION was updated by a concurrent installer"
+    elif [[ -n $current ]] && [[ "$FORCE" == "NO" ]] && [[ "$SYNC" == "NO" ]]; then
+        echo -e "Index location $INDEX_LOCATION already exists. Use --force or --sync to update it"
+    else
+        snapshot="$(date +%Y%m%dT%H%M%S)-$$"
+        staging="$snapshots_dir/.tmp-$snapshot"
+        trap 'rm -rf "$staging"' EXIT
+
+        # Unchanged files are hard links to the current snapshot, index_sync.py never writes in place.
+        if [[ "$SYNC" == "YES" ]] && [[ -n $current ]] \
+            && cp -al "$snapshots_dir/$current" "$staging" && sync_index "$staging"; then
+            echo "Synchronised snapshot $snapshot"
+        else
+            rm -rf "$staging"
+            echo "Downloading index to snapshot $snapshot"
+            download_index "$staging"
+        fi
+
+        mv "$staging" "$snapshots_dir/$snapshot"
+        switch_to "$snapshot"
+    fi
+
+    # Keep the current snapshot and the $KEEP most recent other ones.
+    current=$(basename "$(readlink "$INDEX_LOCATION")")
+    { ls -1 "$snapshots_dir" | sort -r | grep -vxF "$current" || true; } | tail -n +$((KEEP + 1)) \
+    | while read -r old; do rm -rf "${snapshots_dir:?}/$old"; done
+
+    flock -u 9
 else
-    echo -e "Index location $INDEX_LOCATION already exists. Use --force to overwrite"
+    SYNCED=NO
+    if [[ "$SYNC" == "YES" ]] && [[ -d $INDEX_LOCATION ]]; then
+        echo "Synchronising index at $INDEX_LOCATION"
+        if sync_index "$INDEX_LOCATION"; then
+            SYNCED=YES
+        else
+            echo "Incremental synchronisation failed, downloading the whole index"
+            FORCE=YES
+        fi
+    fi
+
+    if [[ "$SYNCED" == "YES" ]]; then
+        echo "Index $INDEX_LOCATION is up to date"
+    elif [[ ! -d $INDEX_LOCATION ]] || [[ "$FORCE" == "YES" ]] || [[ "$SYNC" == "YES" ]]; then
+        echo "Downloading index to $INDEX_LOCATION"
+        # Download the repo archive aside: the current index is kept if the download fails
+        tmp_dir="$(mktemp -d)"
+        trap 'rm -rf "$tmp_dir"' EXIT
+
+        staging="$tmp_dir/staging"
+        download_index "$staging"
+
+        # Mirror to destination (preserve perms, include dotfiles, remove deleted files)
+        rsync -a --delete "$staging"/ "$INDEX_LOCATION"/
+    else
+        echo -e "Index location $INDEX_LOCATION already exists. Use --force to overwrite"
+    fi
 fi
 
 conan remote add -t local-recipes-index $INDEX_NAME $INDEX_LOCATION --force -verror
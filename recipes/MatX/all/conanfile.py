@@ -1,6 +1,6 @@
 from conan import ConanFile
 from conan.tools.cmake import CMake
-from conan.tools.files import get, apply_conandata_patches
+from conan.tools.files import apply_conandata_patches
 import os
 
 class MatX(ConanFile):
@@ -14,6 +14,9 @@ class MatX(ConanFile):
 
     exports_sources = 'patches/*',
 
+    python_requires = 'cosmic_base/[>=1 <2]'
+    python_requires_extend = 'cosmic_base.CMakeRecipe'
+
     options = {
         'file_io':       [True, False],
         'cutensor':      [True, False],
@@ -37,23 +40,17 @@ class MatX(ConanFile):
     }
 
     def source(self):
-        get(self, **self.conan_data['sources'][self.version], strip_root=True)
+        self.python_requires['cosmic_base'].module.get(self, **self.conan_data['sources'][self.version], strip_root=True)
 
     # def requirements(self):
     #     if self.options.file_io:
     #         self.requires('pybind11/[>2.10.0]')
 
-    generators = 'CMakeToolchain' #'CMakeDeps',
-
-    def build(self):
-        apply_conandata_patches(self)
-
-        cmake = CMake(self)
-
+    def _configure_variables(self):
         # variables cannot be set in the generate method because they are
         # declare before the project command in the Matx/CMakeLists.txt file.
         # Doing that make them not visible if placed in cmake_toolchain.cmake file by CMaketoolchain generator.
-        vars = {
+        return {
             'MATX_EN_FILEIO':         bool(self.options.file_io),
             'MATX_EN_CUTENSOR':       bool(self.options.cutensor),
             'MATX_EN_CUTLASS':        bool(self.options.cutlass),
@@ -64,13 +61,12 @@ class MatX(ConanFile):
             'MATX_EN_PYBIND11':       bool(self.options.pybind11)
         }
 
-        # Header only, so no need to build, but the configure is needed to generate the cmake files.
-        cmake.configure(variables=vars)
+    def build(self):
+        apply_conandata_patches(self)
 
-    def package(self):
         cmake = CMake(self)
-        # Install headers and cmake files.
-        cmake.install()
+        # Header only, so no need to build, but the configure is needed to generate the cmake files.
+        cmake.configure(variables=self._configure_variables())
 
     def package_info(self):
          # matx generates its own cmake files so we disable cmake files generations ...
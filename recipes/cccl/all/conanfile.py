@@ -1,11 +1,13 @@
+import glob
 import os
+import re
 
 from conan import ConanFile
-from conan.errors import ConanInvalidConfiguration
+from conan.errors import ConanException, ConanInvalidConfiguration
 from conan.tools.build import check_min_cppstd
 from conan.tools.cmake import CMake, CMakeToolchain, cmake_layout
 from conan.tools.env import VirtualBuildEnv
-from conan.tools.files import copy, get, rmdir, replace_in_file
+from conan.tools.files import copy, load, rmdir, replace_in_file, save, unzip
 from conan.tools.scm import Version
 
 required_conan_version = ">=1.52.0"
@@ -21,12 +23,42 @@ class NvCCCL(ConanFile):
     package_type = "header-library"
     settings = "os", "arch", "compiler", "build_type"
     short_paths = True
+    python_requires = "cosmic_base/[>=1 <2]"
     # TODO: add header_only=False option
 
+    options = {
+        # Install with the CMake install rules of cccl instead of copying the headers.
+        "cmake_install": [True, False],
+    }
+    default_options = {
+        "cmake_install": False,
+    }
+
     @property
     def _min_cppstd(self):
         return 17
 
+    # Only the part of the archive needed by the install rules of cub, thrust and
+    # libcudacxx is extracted: no c2h, cudax, python, docs, examples or tests.
+    _source_patterns = [
+        "*/LICENSE",
+        "*/lib/cmake/*",
+        "*-header-search.cmake.in",
+        "*/cub/cub/*",
+        "*/thrust/thrust/*",
+        "*/libcudacxx/include/*",
+    ]
+
+    # Header folders of the sources, and where they are installed.
+    _header_folders = {
+        os.path.join("cub", "cub"): "cub",
+        os.path.join("thrust", "thrust"): "thrust",
+        os.path.join("libcudacxx", "include"): ".",
+    }
+
+    # CMake packages installed in lib/cmake. cudax is not installed.
+    _cmake_packages = ("cccl", "cub", "thrust", "libcudacxx")
+
     @property
     def _compilers_minimum_version(self):
         return {
@@ -41,7 +73,10 @@ class NvCCCL(ConanFile):
         cmake_layout(self, src_folder="src")
 
     def package_id(self):
+        # Headers only, but the two install modes do not package the same files.
+        cmake_install = self.info.options.cmake_install
         self.info.clear()
+        self.info.options.cmake_install = cmake_install
 
     def validate(self):
         if self.settings.compiler.get_safe("cppstd"):
@@ -53,12 +88,28 @@ class NvCCCL(ConanFile):
             )
 
     def build_requirements(self):
-        self.tool_requires("cmake/[>=3.15 <4]")
+        if self.options.cmake_install:
+            self.tool_requires("cmake/[>=3.15 <4]")
+
+    @property
+    def _archive(self):
+        # The options are not known in source(): the archive is kept for the cmake_install builds.
+        url = self.conan_data["sources"][self.version]["url"]
+        return os.path.join(self.source_folder, os.path.basename(url))
 
     def source(self):
-        get(self, **self.conan_data["sources"][self.version], strip_root=True)
+        self.python_requires["cosmic_base"].module.get(
+            self, **self.conan_data["sources"][self.version], strip_root=True, pattern=self._source_patterns,
+            archive=self._archive)
+
+    @property
+    def _full_source_folder(self):
+        return os.path.join(self.build_folder, "cccl-src")
 
     def generate(self):
+        if not self.options.cmake_install:
+            return
+
         # Install via CMake to ensure headers are configured correctly
         tc = CMakeToolchain(self)
 
@@ -81,13 +132,55 @@ class NvCCCL(ConanFile):
         VirtualBuildEnv(self).generate()
 
     def build(self):
+        if not self.options.cmake_install:
+            return
+
+        # The CMake project needs the whole archive, not only the installed parts.
+        unzip(self, self._archive, destination=self._full_source_folder, strip_root=True)
         # self._patch_sources()
         cmake = CMake(self)
-        cmake.configure()
+        cmake.configure(build_script_folder=self._full_source_folder)
         cmake.build()
 
+    def _install_headers(self):
+        """
+        Reproduce the install rules of cub, thrust and libcudacxx without
+        configuring the CMake project: copy the header folders and the CMake
+        packages, and generate the `*-header-search.cmake` files.
+        """
+        for src, dst in self._header_folders.items():
+            copy(self, "*", os.path.join(self.source_folder, src), os.path.join(self.package_folder, "include", dst),
+                 excludes="CMakeLists.txt")
+
+        cmake_folder = os.path.join(self.package_folder, "lib", "cmake")
+        for name in self._cmake_packages:
+            copy(self, "*", os.path.join(self.source_folder, "lib", "cmake", name), os.path.join(cmake_folder, name),
+                 excludes="*.in")
+
+            templates = glob.glob(os.path.join(self.source_folder, "**", f"{name}-header-search.cmake.in"), recursive=True)
+            if not templates:
+                raise ConanException(
+                    f"{name}-header-search.cmake.in not found, install with -o cccl/*:cmake_install=True")
+            # Same values as `configure_file` in the install rules, for an install in `include` and `lib/cmake/<name>`.
+            content = load(self, templates[0]) \
+                .replace("@from_install_prefix@", "../../../") \
+                .replace("@CMAKE_INSTALL_INCLUDEDIR@", "include")
+            unknown = sorted(set(re.findall(r"@(\w+)@", content)))
+            if unknown:
+                raise ConanException(
+                    f"{os.path.basename(templates[0])} uses {', '.join(unknown)}, install with -o cccl/*:cmake_install=True")
+            save(self, os.path.join(cmake_folder, name, f"{name}-header-search.cmake"), content)
+
+        for name in self._cmake_packages:
+            if not os.path.isfile(os.path.join(cmake_folder, name, f"{name}-config.cmake")):
+                raise ConanException(f"{name}-config.cmake not found, install with -o cccl/*:cmake_install=True")
+
     def package(self):
         copy(self, "LICENSE", self.source_folder, os.path.join(self.package_folder, "licenses"))
+        if not self.options.cmake_install:
+            self._install_headers()
+            return
+
         cmake = CMake(self)
         cmake.install()
 
@@ -0,0 +1,280 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import time
+import xml.etree.ElementTree as ElementTree
+
+from conan.errors import ConanInvalidConfiguration
+from conan.tools.build import build_jobs, cross_building
+from conan.tools.cmake import CMake, CMakeToolchain
+from conan.tools.env import VirtualBuildEnv
+from conan.tools.files import load, save
+
+import compiler_cache
+
+GENERATOR_CONF = 'tools.cmake.cmaketoolchain:generator'
+# Maximum number of concurrent link jobs with Ninja (LTO links are memory hungry).
+LINK_JOBS_CONF = 'user.cosmic:link_jobs'
+# Defaults of the `unity_build`, `unity_build_batch_size` and `lto` options, for the recipes not declaring them.
+UNITY_BUILD_CONF = 'user.cosmic:unity_build'
+UNITY_BUILD_BATCH_SIZE_CONF = 'user.cosmic:unity_build_batch_size'
+LTO_CONF = 'user.cosmic:lto'
+# Host ISA level (`-march`), e.g. `x86-64-v3` or `native`, for the recipes not declaring an `isa` option.
+ISA_CONF = 'user.cosmic:isa'
+# Tests are only run when asked, e.g. in CI: `-c user.cosmic:run_tests=True`.
+RUN_TESTS_CONF = 'user.cosmic:run_tests'
+# Parallel ctest jobs, `tools.build:jobs` by default.
+TEST_JOBS_CONF = 'user.cosmic:test_jobs'
+# Number of the slowest tests printed after a test run.
+SLOWEST_TESTS = 10
+# JSON file where the build times are recorded, to compare the build options affecting them.
+BUILD_TIMES_CONF = 'user.cosmic:build_times'
+
+# Options only changing how the binaries are built, not the binaries: not part of the package_id.
+BUILD_SPEED_OPTIONS = ('unity_build', 'unity_build_batch_size', 'precompile_headers')
+
+# Included through CMAKE_PROJECT_INCLUDE: once the whole project is processed,
+# precompile the headers in every C++ target.
+PRECOMPILE_HEADERS_CMAKE = '''include_guard(GLOBAL)
+
+function(cosmic_precompile_headers directory)
+  get_property(targets DIRECTORY "${{directory}}" PROPERTY BUILDSYSTEM_TARGETS)
+  foreach(target IN LISTS targets)
+    get_target_property(type ${{target}} TYPE)
+    if(type MATCHES "^(STATIC_LIBRARY|SHARED_LIBRARY|MODULE_LIBRARY|OBJECT_LIBRARY|EXECUTABLE)$")
+      target_precompile_headers(${{target}} PRIVATE {headers})
+    endif()
+  endforeach()
+  get_property(subdirectories DIRECTORY "${{directory}}" PROPERTY SUBDIRECTORIES)
+  foreach(subdirectory IN LISTS subdirectories)
+    cosmic_precompile_headers("${{subdirectory}}")
+  endforeach()
+endfunction()
+
+cmake_language(DEFER DIRECTORY "${{CMAKE_SOURCE_DIR}}" CALL cosmic_precompile_headers "${{CMAKE_SOURCE_DIR}}")
+'''
+
+# x86-64 micro-architecture levels, portable across the CPUs implementing them.
+ISA_LEVELS = ('x86-64-v2', 'x86-64-v3', 'x86-64-v4')
+
+def generator(conanfile):
+    """The generator of `global.conf`, or Ninja when it is installed."""
+    value = conanfile.conf.get(GENERATOR_CONF)
+    if value is None and shutil.which('ninja'):
+        value = 'Ninja'
+    return value
+
+def native_isa(conanfile, compiler):
+    """
+    CPU selected by `-march=native` on this machine (e.g. `znver4`), None if the
+    compiler cannot tell. gcc prints it with `-Q --help=target`, clang as `-target-cpu`.
+    """
+    executables = conanfile.conf.get('tools.build:compiler_executables', default={}, check_type=dict)
+    executable = executables.get('cpp') or os.environ.get('CXX') or \
+        {'clang': 'clang++'}.get(str(compiler), 'g++')
+    for args, pattern in ((['-Q', '--help=target'], r'^\s*-march=\s+(\S+)'),
+                          (['-###', '-x', 'c++', '-c', os.devnull], r'"-target-cpu" "([^"]+)"')):
+        try:
+            result = subprocess.run([executable, '-march=native', *args], capture_output=True, text=True)
+        except OSError:
+            return None
+        match = re.search(pattern, result.stdout + result.stderr, re.MULTILINE)
+        if match:
+            return match.group(1)
+    return None
+
+class CMakeRecipe:
+    """
+    Common CMake flow of the recipes: `python_requires_extend = 'cosmic_base.CMakeRecipe'`.
+
+    The toolchain gets the generator, the compiler cache launchers, the
+    unity build and LTO settings, so they apply to every recipe from here.
+    Recipes customize it with:
+      - `_cmake_cuda`: True when nvcc is used (CUDA compiler launcher).
+      - `_precompiled_headers`: headers precompiled in every C++ target
+        when the recipe has a `precompile_headers` option enabled.
+      - `_configure_toolchain(tc)`: recipe specific toolchain variables.
+      - `_configure_variables()`: variables given on the configure command
+        line, for projects reading them before `project()`.
+    Options `unity_build`, `unity_build_batch_size`, `lto` and `isa` take
+    precedence over the conf of the same name when the recipe declares them.
+    `unity_build`, `unity_build_batch_size` and `precompile_headers` do not
+    change the binaries and are removed from the package_id; `lto` and `isa`
+    do, and are part of it even when set by conf (`isa=native` as the CPU
+    name, so binaries built on different CPUs do not collide).
+
+    Recipes with tests call `_test(cmake)` after building; `_run_tests`
+    tells whether tests are enabled, to skip building them otherwise.
+    """
+
+    _precompiled_headers = ()
+
+    @property
+    def _cmake_cuda(self):
+        return bool(self.options.get_safe('cuda'))
+
+    def _configure_toolchain(self, tc):
+        pass
+
+    def _configure_variables(self):
+        return None
+
+    def _option_or_conf(self, option, conf, check_type=bool):
+        """Value of `option` when the recipe declares it, of `conf` otherwise."""
+        if option in self.options:
+            return check_type(self.options.get_safe(option))
+        return self.conf.get(conf, check_type=check_type)
+
+    @property
+    def _run_tests(self):
+        return bool(self.conf.get(RUN_TESTS_CONF, check_type=bool)) \
+            and not self.conf.get('tools.build:skip_test', check_type=bool)
+
+    @property
+    def _lto(self):
+        return bool(self._option_or_conf('lto', LTO_CONF))
+
+    @property
+    def _isa(self):
+        if 'isa' in self.options:
+            isa = self.options.get_safe('isa')
+            return str(isa) if isa else None
+        return self.conf.get(ISA_CONF)
+
+    def validate(self):
+        isa = self._isa
+        if isa in ISA_LEVELS and self.settings.get_safe('arch') != 'x86_64':
+            raise ConanInvalidConfiguration(f'isa={isa} requires arch=x86_64')
+        if isa == 'native' and cross_building(self):
+            raise ConanInvalidConfiguration('isa=native cannot be used when cross building')
+        if isa and isa != 'native' and isa not in ISA_LEVELS:
+            raise ConanInvalidConfiguration(f'{ISA_CONF}: unknown isa {isa}, use native or one of {", ".join(ISA_LEVELS)}')
+
+    def package_id(self):
+        for option in BUILD_SPEED_OPTIONS:
+            if option in self.info.options:
+                self.info.options.rm_safe(option)
+        # LTO and the ISA change the binaries: when enabled by conf, they must be part of the package_id.
+        if 'lto' not in self.info.options and self.conf.get(LTO_CONF, check_type=bool):
+            self.info.conf.define(LTO_CONF, True)
+        if 'isa' in self.info.options:
+            isa = self.info.options.get_safe('isa')
+            isa = str(isa) if isa else None
+        else:
+            isa = self.conf.get(ISA_CONF)
+        if isa == 'native':
+            isa = f'native={native_isa(self, self.info.settings.get_safe("compiler")) or "unknown"}'
+        if 'isa' in self.info.options:
+            if isa:
+                self.info.options.isa = isa
+        elif isa:
+            self.info.conf.define(ISA_CONF, isa)
+
+    def generate(self):
+        tc = CMakeToolchain(self, generator=generator(self))
+
+        compiler_cache.cmake_launchers(self, tc, cuda=self._cmake_cuda)
+
+        if self._option_or_conf('unity_build', UNITY_BUILD_CONF):
+            tc.cache_variables['CMAKE_UNITY_BUILD'] = True
+            batch_size = self._option_or_conf('unity_build_batch_size', UNITY_BUILD_BATCH_SIZE_CONF, int)
+            if batch_size:
+                tc.cache_variables['CMAKE_UNITY_BUILD_BATCH_SIZE'] = batch_size
+
+        if self._lto:
+            tc.cache_variables['CMAKE_POLICY_DEFAULT_CMP0069'] = 'NEW'
+            tc.cache_variables['CMAKE_INTERPROCEDURAL_OPTIMIZATION'] = True
+
+        isa = self._isa
+        if isa:
+            tc.extra_cflags.append(f'-march={isa}')
+            tc.extra_cxxflags.append(f'-march={isa}')
+            if self._cmake_cuda:
+                # Host code compiled by nvcc.
+                tc.variables['CMAKE_CUDA_FLAGS_INIT'] = f'-Xcompiler=-march={isa}'
+
+        if self.options.get_safe('precompile_headers') and self._precompiled_headers:
+            # nvcc does not support precompiled headers: C++ sources only.
+            headers = ' '.join(f'"$<$<COMPILE_LANGUAGE:CXX>:<{h}$<ANGLE-R>>"' for h in self._precompiled_headers)
+            path = os.path.join(self.generators_folder, 'cosmic_precompile_headers.cmake')
+            save(self, path, PRECOMPILE_HEADERS_CMAKE.format(headers=headers))
+            tc.cache_variables['CMAKE_PROJECT_INCLUDE'] = path.replace('\\', '/')
+
+        link_jobs = self.conf.get(LINK_JOBS_CONF, check_type=int)
+        if link_jobs and 'Ninja' in (tc.generator or ''):
+            tc.cache_variables['CMAKE_JOB_POOLS'] = f'link={link_jobs}'
+            tc.cache_variables['CMAKE_JOB_POOL_LINK'] = 'link'
+
+        self._configure_toolchain(tc)
+        tc.generate()
+        VirtualBuildEnv(self).generate()
+
+    def build(self):
+        cmake = CMake(self)
+        cmake.configure(variables=self._configure_variables())
+        # The job count comes from `tools.build:jobs` (all the cores by default).
+        start = time.perf_counter()
+        with compiler_cache.statistics(self):
+            cmake.build()
+        self._report_build_time(time.perf_counter() - start)
+
+    def _build_variant(self):
+        variant = {option: str(self.options.get_safe(option)) for option in BUILD_SPEED_OPTIONS if option in self.options}
+        variant['build_type'] = str(self.settings.get_safe('build_type'))
+        variant['compiler_cache'] = self.conf.get(compiler_cache.CACHE_CONF)
+        return variant
+
+    def _report_build_time(self, seconds):
+        """
+        Print the build time and, when `user.cosmic:build_times` is set, record
+        it and compare it to the last build of the same reference without
+        unity build nor precompiled headers.
+        """
+        self.output.info(f'Build time: {seconds:.1f} s')
+        path = self.conf.get(BUILD_TIMES_CONF)
+        if not path:
+            return
+
+        def without_batch_size(variant):
+            return {k: v for k, v in variant.items() if k != 'unity_build_batch_size'}
+
+        records = json.loads(load(self, path)) if os.path.isfile(path) else []
+        variant = self._build_variant()
+        baseline = dict(without_batch_size(variant),
+                        **{o: 'False' for o in ('unity_build', 'precompile_headers') if o in variant})
+        previous = [r for r in records if r['ref'] == str(self.ref) and without_batch_size(r['variant']) == baseline]
+        if previous and without_batch_size(variant) != baseline:
+            reference = previous[-1]['seconds']
+            self.output.info(f'Build time: {seconds - reference:+.1f} s ({100 * (seconds - reference) / reference:+.0f}%) '
+                             f'compared to {reference:.1f} s without unity build nor precompiled headers')
+
+        records.append({'ref': str(self.ref), 'variant': variant, 'seconds': round(seconds, 2)})
+        save(self, path, json.dumps(records, indent=1))
+
+    def package(self):
+        cmake = CMake(self)
+        cmake.install()
+
+    def _test(self, cmake):
+        """Run ctest in parallel when tests are enabled, then print the slowest tests."""
+        if not self._run_tests:
+            return
+
+        report = os.path.join(self.build_folder, 'ctest-results.xml')
+        cli_args = ['--output-on-failure', f'--output-junit "{report}"']
+        # CMake.ctest passes `--parallel` with the `tools.build:jobs` count first: ctest uses the last one.
+        test_jobs = self.conf.get(TEST_JOBS_CONF, check_type=int)
+        if test_jobs:
+            cli_args.append(f'--parallel {test_jobs}')
+        jobs = test_jobs or build_jobs(self)
+        cmake.ctest(cli_args=cli_args)
+
+        if not os.path.isfile(report):
+            return
+        timings = sorted(((float(case.get('time', 0)), case.get('name'))
+                          for case in ElementTree.parse(report).iter('testcase')), reverse=True)
+        self.output.info(f'{len(timings)} test(s), {sum(t for t, _ in timings):.2f} s of test time with {jobs} job(s)')
+        for seconds, name in timings[:SLOWEST_TESTS]:
+            self.output.info(f'{seconds:8.2f} s  {name}')
@@ -0,0 +1,110 @@
+import json
+import os
+import shutil
+import subprocess
+from contextlib import contextmanager
+
+from conan.errors import ConanException
+from conan.tools.env import Environment
+
+# Compiler cache used as compiler launcher, `ccache` or `sccache`, e.g. `user.cosmic:compiler_cache=ccache`
+CACHE_CONF = 'user.cosmic:compiler_cache'
+# Cache folder, shared by every build of the machine (or of several runners on a shared filesystem).
+CACHE_DIR_CONF = 'user.cosmic:compiler_cache_dir'
+
+CACHE_DIR_VARIABLES = {
+    'ccache': 'CCACHE_DIR',
+    'sccache': 'SCCACHE_DIR',
+}
+
+def launcher(conanfile):
+    """Path of the compiler cache selected by `user.cosmic:compiler_cache`, None when disabled."""
+    name = conanfile.conf.get(CACHE_CONF)
+    if not name:
+        return None
+    if name not in CACHE_DIR_VARIABLES:
+        raise ConanException(f'{CACHE_CONF}: unknown compiler cache {name}, use one of {", ".join(CACHE_DIR_VARIABLES)}')
+    path = shutil.which(name)
+    if path is None:
+        conanfile.output.warning(f'{CACHE_CONF}={name} but {name} is not in the PATH, building without it')
+    return path
+
+def _name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+def environment(conanfile, path):
+    env = Environment()
+    cache_dir = conanfile.conf.get(CACHE_DIR_CONF)
+    if cache_dir:
+        env.define(CACHE_DIR_VARIABLES[_name(path)], cache_dir)
+    if _name(path) == 'ccache':
+        # Conan builds every package in its own folder: hash paths relative to
+        # the common parent of the source and build folders so hits are shared.
+        env.define('CCACHE_BASEDIR', os.path.commonpath([conanfile.source_folder, conanfile.build_folder]))
+        env.define('CCACHE_NOHASHDIR', '1')
+    return env
+
+def cmake_launchers(conanfile, toolchain, cuda=False):
+    """
+    Set the compiler cache as `CMAKE_<LANG>_COMPILER_LAUNCHER` of a
+    `CMakeToolchain` and generate the environment pointing it to the shared
+    cache folder. Call before `toolchain.generate()`.
+    """
+    path = launcher(conanfile)
+    if path is None:
+        return
+    for lang in ('C', 'CXX') + (('CUDA',) if cuda else ()):
+        toolchain.cache_variables[f'CMAKE_{lang}_COMPILER_LAUNCHER'] = path
+    environment(conanfile, path).vars(conanfile, scope='build').save_script('conan_compiler_cache')
+
+def autotools_launchers(conanfile, toolchain):
+    """
+    Prefix `CC` and `CXX` with the compiler cache in the environment of an
+    `AutotoolsToolchain`. Pass the returned environment to `toolchain.generate()`.
+    """
+    env = toolchain.environment()
+    path = launcher(conanfile)
+    if path is None:
+        return env
+
+    executables = conanfile.conf.get('tools.build:compiler_executables', default={}, check_type=dict)
+    compiler = str(conanfile.settings.get_safe('compiler'))
+    defaults = {'gcc': ('gcc', 'g++'), 'clang': ('clang', 'clang++')}.get(compiler, ('cc', 'c++'))
+    for variable, lang, default in (('CC', 'c', defaults[0]), ('CXX', 'cpp', defaults[1])):
+        env.define(variable, f'{path} {executables.get(lang) or os.environ.get(variable) or default}')
+    env.compose_env(environment(conanfile, path))
+    return env
+
+def _stats(conanfile, path):
+    """Cumulated `(hits, misses)` of the cache, None if they cannot be read."""
+    # Same cache folder as the build: the sccache server started here serves the compilations of the build.
+    env = {**os.environ, **dict(environment(conanfile, path).vars(conanfile).items())}
+    try:
+        if _name(path) == 'sccache':
+            output = subprocess.run([path, '--show-stats', '--stats-format=json'],
+                                    capture_output=True, text=True, check=True, env=env).stdout
+            stats = json.loads(output)['stats']
+            return (sum(stats['cache_hits']['counts'].values()),
+                    sum(stats['cache_misses']['counts'].values()))
+        output = subprocess.run([path, '--print-stats'], capture_output=True, text=True, check=True, env=env).stdout
+        stats = dict(line.split('\t', 1) for line in output.splitlines() if '\t' in line)
+        hits = int(stats.get('direct_cache_hit', 0)) + int(stats.get('preprocessed_cache_hit', 0))
+        return hits, int(stats.get('cache_miss', 0))
+    except (OSError, subprocess.CalledProcessError, ValueError, KeyError):
+        return None
+
+@contextmanager
+def statistics(conanfile):
+    """
+    Report the hits and misses of the compiler cache during the block, as the
+    difference of the cache counters (the cache may be used concurrently by
+    other builds, so the numbers are an upper bound).
+    """
+    path = launcher(conanfile)
+    before = _stats(conanfile, path) if path else None
+    yield
+    after = _stats(conanfile, path) if before else None
+    if after:
+        hits, misses = after[0] - before[0], after[1] - before[1]
+        rate = 100 * hits / (hits + misses) if hits + misses else 0
+        conanfile.output.info(f'{_name(path)}: {hits} hit(s), {misses} miss(es), {rate:.0f}% hit rate')
@@ -0,0 +1,13 @@
+from conan import ConanFile
+
+import compiler_cache
+from cmake_recipe import CMakeRecipe
+
+from sources import get, fetch, store_path
+from stream import extract_stream, stream_get
+
+class Pkg(ConanFile):
+    name = 'cosmic_base'
+    version = '1.0.0'
+    package_type = 'python-require'
+    exports = 'sources.py', 'stream.py', 'compiler_cache.py', 'cmake_recipe.py'
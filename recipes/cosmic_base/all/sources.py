@@ -0,0 +1,134 @@
+import os
+import shutil
+
+from conan.tools.files import check_sha256, download, unzip
+from conan.tools.files import get as conan_get
+
+from stream import extract_stream, is_zip, stream_get
+
+# Root of the content addressed source store, e.g. `user.cosmic:source_store=/shared/cosmic-sources`
+STORE_CONF = 'user.cosmic:source_store'
+# Set to False to download, verify and extract in separate passes like `conan.tools.files.get`.
+STREAM_CONF = 'user.cosmic:stream_sources'
+
+def store_path(store, sha256, filename):
+    # Keep in sync with tools/source_mirror.py
+    return os.path.join(store, sha256[:2], sha256, filename)
+
+def _filename(url, filename):
+    if filename:
+        return filename
+    if isinstance(url, (list, tuple)):
+        url = url[0]
+    return os.path.basename(url.split('?', 1)[0])
+
+def _backup_sources(conanfile):
+    # The download cache and backup sources of conan (global.conf) are only handled by the conan downloader.
+    conf = conanfile._conan_helpers.global_conf
+    return conf.get('core.sources:download_cache') or conf.get('core.sources:download_urls')
+
+def fetch(conanfile, url, sha256, filename='', **kwargs):
+    """
+    Return the path of the archive `sha256` in the source store, downloading
+    it first if missing. The store is shared between runners: archives are
+    written to a temporary name and renamed once verified.
+    """
+    store = conanfile.conf.get(STORE_CONF)
+    path = store_path(store, sha256, _filename(url, filename))
+
+    if os.path.isfile(path):
+        conanfile.output.info(f'Using {path} from the source store')
+        check_sha256(conanfile, path, sha256)
+        return path
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        download(conanfile, url, tmp_path, sha256=sha256, **kwargs)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+def get(conanfile, url, sha256=None, destination='.', filename='', keep_permissions=False,
+        pattern=None, strip_root=False, archive=None, **kwargs):
+    """
+    Drop-in replacement of `conan.tools.files.get`. Archives with a sha256
+    are streamed through the hasher and the extractor in a single pass,
+    through the source store when `user.cosmic:source_store` is set.
+    Falls back to `conan.tools.files.get` otherwise, and when the conan
+    backup sources (`core.sources:download_urls`) or sources download cache
+    are configured.
+
+    `pattern` can also be a list of patterns. It is only an optimization:
+    the conan fallback extracts the whole archive.
+
+    When `archive` is set, the verified archive is also kept at this path,
+    to extract more of it later without downloading it again.
+    """
+    filename = _filename(url, filename)
+    # Zip permissions are only in the central directory, at the end of the archive.
+    streamable = conanfile.conf.get(STREAM_CONF, check_type=bool, default=True) \
+        and not (keep_permissions and is_zip(filename)) and not _backup_sources(conanfile)
+    store = conanfile.conf.get(STORE_CONF)
+
+    conan_pattern = pattern if pattern is None or isinstance(pattern, str) else None
+
+    if not sha256 or not (store or streamable):
+        if archive is None:
+            conan_get(conanfile, url, sha256=sha256, destination=destination, filename=filename,
+                      keep_permissions=keep_permissions, pattern=conan_pattern, strip_root=strip_root, **kwargs)
+            return
+        unzip_kwargs = {'extract_filter': kwargs.pop('extract_filter')} if 'extract_filter' in kwargs else {}
+        download(conanfile, url, archive, sha256=sha256, **kwargs)
+        unzip(conanfile, archive, destination=destination, keep_permissions=keep_permissions,
+              pattern=conan_pattern, strip_root=strip_root, **unzip_kwargs)
+        return
+
+    if not streamable:
+        # Only `extract_filter` is an extraction argument, the others are for the download.
+        unzip_kwargs = {'extract_filter': kwargs.pop('extract_filter')} if 'extract_filter' in kwargs else {}
+        path = fetch(conanfile, url, sha256, filename, **kwargs)
+        if archive is not None:
+            shutil.copyfile(path, archive)
+        unzip(conanfile, path, destination=destination, keep_permissions=keep_permissions,
+              pattern=conan_pattern, strip_root=strip_root, **unzip_kwargs)
+        return
+
+    extract_kwargs = dict(destination=destination, pattern=pattern, strip_root=strip_root,
+                          extract_filter=kwargs.get('extract_filter'))
+    if not store:
+        if archive is None:
+            stream_get(conanfile, url, sha256, filename=filename, **extract_kwargs)
+            return
+        try:
+            with open(archive, 'wb') as tee:
+                stream_get(conanfile, url, sha256, filename=filename, tee=tee, **extract_kwargs)
+        except BaseException:
+            os.remove(archive)
+            raise
+        return
+
+    path = store_path(store, sha256, filename)
+    if os.path.isfile(path):
+        conanfile.output.info(f'Using {path} from the source store')
+        with open(path, 'rb') as f:
+            extract_stream(conanfile, f, sha256, filename, **extract_kwargs)
+        if archive is not None:
+            shutil.copyfile(path, archive)
+        return
+
+    # The archive is written to the store while it is extracted, and only
+    # renamed to its final name once the sha256 matched.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as tee:
+            stream_get(conanfile, url, sha256, filename=filename, tee=tee, **extract_kwargs)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    if archive is not None:
+        shutil.copyfile(path, archive)
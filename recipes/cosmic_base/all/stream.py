@@ -0,0 +1,324 @@
+import fnmatch
+import hashlib
+import http.client
+import os
+import shutil
+import struct
+import tarfile
+import time
+import urllib.request
+import zlib
+
+import urllib3
+from conan.errors import ConanException
+
+CHUNK_SIZE = 1 << 20
+
+class HashingReader:
+    """
+    File-like wrapper hashing everything read from `raw` and optionally
+    copying it to `tee`, so a single pass over the data verifies, stores and
+    extracts the archive. Bytes given back with `unread` are served again
+    without being hashed twice.
+    """
+    def __init__(self, raw, tee=None):
+        self.raw = raw
+        self.tee = tee
+        self.sha = hashlib.sha256()
+        self.size = 0
+        self.pushed = b''
+
+    def read(self, size=-1):
+        if self.pushed:
+            size = len(self.pushed) if size < 0 else size
+            data, self.pushed = self.pushed[:size], self.pushed[size:]
+            return data
+        data = self.raw.read(size)
+        self.sha.update(data)
+        if self.tee is not None:
+            self.tee.write(data)
+        self.size += len(data)
+        return data
+
+    def read_exactly(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.read(size - len(data))
+            if not chunk:
+                raise ConanException('Unexpected end of archive')
+            data += chunk
+        return data
+
+    def unread(self, data):
+        self.pushed = data + self.pushed
+
+    def drain(self):
+        self.pushed = b''
+        while self.read(CHUNK_SIZE):
+            pass
+        return self.sha.hexdigest()
+
+def _root(name):
+    return name.replace('\\', '/').lstrip('/').partition('/')[0]
+
+def _strip(name, root):
+    name = name.replace('\\', '/').lstrip('/')
+    if not root:
+        return name
+    first, _, rest = name.partition('/')
+    if first != root:
+        raise ConanException(f'strip_root: {name} is not under {root}/')
+    return rest
+
+def _selected(name, target, pattern):
+    # Like `unzip`, the pattern applies to the archive names, before stripping the root.
+    # A list of patterns selects the members matching any of them.
+    if not target:
+        return False
+    if pattern is None:
+        return True
+    patterns = [pattern] if isinstance(pattern, str) else pattern
+    return any(fnmatch.fnmatch(name, p) for p in patterns)
+
+#######
+# TAR #
+#######
+
+def _extract_tar(reader, destination, strip_root, pattern, extract_filter):
+    root = None
+    kwargs = {'filter': extract_filter} if extract_filter and hasattr(tarfile, 'data_filter') else {}
+    # `r|*` reads the members sequentially, without ever seeking back.
+    with tarfile.open(fileobj=reader, mode='r|*') as tar:
+        for member in tar:
+            name = member.name
+            if strip_root:
+                root = root or _root(member.name)
+                member.name = _strip(member.name, root)
+                if member.islnk():
+                    member.linkname = _strip(member.linkname, root)
+            if _selected(name, member.name, pattern):
+                tar.extract(member, destination, **kwargs)
+
+#######
+# ZIP #
+#######
+
+_LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+_LOCAL_SIGNATURE = b'PK\x03\x04'
+_DESCRIPTOR_SIGNATURE = b'PK\x07\x08'
+_ZIP64_SIZE = 0xFFFFFFFF
+
+def _zip64_sizes(extra, compressed_size, size):
+    while len(extra) >= 4:
+        tag, length = struct.unpack('<HH', extra[:4])
+        if tag == 1:
+            values = list(struct.unpack(f'<{length // 8}Q', extra[4:4 + length // 8 * 8]))
+            if size == _ZIP64_SIZE and values:
+                size = values.pop(0)
+            if compressed_size == _ZIP64_SIZE and values:
+                compressed_size = values.pop(0)
+        extra = extra[4 + length:]
+    return compressed_size, size
+
+def _inflate(reader, out, compressed_size):
+    """Inflate one member. Without a known size, stop at the end of the deflate stream."""
+    inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+    remaining = compressed_size
+    while not inflater.eof:
+        chunk = reader.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+        if not chunk:
+            raise ConanException('Unexpected end of archive')
+        if remaining is not None:
+            remaining -= len(chunk)
+        data = inflater.decompress(chunk)
+        if out is not None:
+            out.write(data)
+    # What was read past the end of the member belongs to the next header.
+    reader.unread(inflater.unused_data)
+
+def _copy(reader, out, size):
+    while size:
+        data = reader.read_exactly(min(CHUNK_SIZE, size))
+        size -= len(data)
+        if out is not None:
+            out.write(data)
+
+def _extract_zip(reader, destination, strip_root, pattern):
+    """
+    Extract a zip from its local headers, in archive order. The central
+    directory at the end is only hashed, so permissions are not restored.
+    """
+    root = None
+    while reader.read_exactly(4) == _LOCAL_SIGNATURE:
+        (_, _, flags, method, _, _, _, compressed_size, size,
+         name_length, extra_length) = _LOCAL_HEADER.unpack(_LOCAL_SIGNATURE + reader.read_exactly(_LOCAL_HEADER.size - 4))
+        name = reader.read_exactly(name_length).decode('utf-8' if flags & 0x800 else 'cp437')
+        compressed_size, size = _zip64_sizes(reader.read_exactly(extra_length), compressed_size, size)
+        has_descriptor = bool(flags & 0x8)
+        if flags & 0x1:
+            raise ConanException(f'{name}: encrypted zip members are not supported')
+        if method not in (0, 8) or (method == 0 and has_descriptor):
+            raise ConanException(f'{name}: zip member cannot be streamed (method {method})')
+
+        target = name
+        if strip_root:
+            root = root or _root(name)
+            target = _strip(name, root)
+        out = None
+        if _selected(name, target, pattern):
+            path = os.path.join(destination, target)
+            if os.path.commonpath([os.path.abspath(path), destination]) != destination:
+                raise ConanException(f'{name} is outside of the destination')
+            if name.endswith('/'):
+                os.makedirs(path, exist_ok=True)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                out = open(path, 'wb')
+
+        try:
+            if method == 8:
+                _inflate(reader, out, None if has_descriptor else compressed_size)
+            else:
+                _copy(reader, out, compressed_size)
+        finally:
+            if out is not None:
+                out.close()
+
+        if has_descriptor:
+            # crc32 and sizes, optionally preceded by a signature; sizes are 8 bytes for zip64 members.
+            descriptor = reader.read_exactly(4)
+            if descriptor == _DESCRIPTOR_SIGNATURE:
+                reader.read_exactly(4)
+            reader.read_exactly(16 if compressed_size == _ZIP64_SIZE else 8)
+
+############
+# DOWNLOAD #
+############
+
+def is_zip(filename):
+    return filename.lower().endswith('.zip')
+
+def _publish(staging, destination):
+    # Merged like `unzip` would: existing folders are kept, existing files replaced.
+    for name in os.listdir(staging):
+        source, target = os.path.join(staging, name), os.path.join(destination, name)
+        if os.path.isdir(target) and not os.path.islink(target):
+            if os.path.isdir(source) and not os.path.islink(source):
+                _publish(source, target)
+                continue
+            shutil.rmtree(target)
+        elif os.path.lexists(target):
+            os.remove(target)
+        os.replace(source, target)
+
+def extract_stream(conanfile, raw, sha256, filename, destination='.', pattern=None, strip_root=False,
+                   extract_filter=None, tee=None):
+    """
+    Extract the archive read from `raw` while hashing it (and copying it to
+    `tee`). Members are extracted in a staging folder, moved to
+    `destination` only once the sha256 matched.
+    """
+    destination = os.path.abspath(destination)
+    os.makedirs(destination, exist_ok=True)
+    staging = os.path.join(destination, f'.{filename}.{os.getpid()}.extract')
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    reader = HashingReader(raw, tee)
+    try:
+        if is_zip(filename):
+            _extract_zip(reader, staging, strip_root, pattern)
+        else:
+            _extract_tar(reader, staging, strip_root, pattern, extract_filter)
+        digest = reader.drain()
+        if sha256 and digest != sha256.lower():
+            raise ConanException(f'sha256 signature failed for {filename}: expected {sha256}, got {digest}')
+        _publish(staging, destination)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return reader.size
+
+class _Body:
+    """
+    Body of an HTTP response. A connection closed before Content-Length
+    bytes were received raises `ConnectionError` instead of ending the
+    archive early, so it is retried rather than reported as a bad sha256.
+    """
+    def __init__(self, response, raw, length=None):
+        self.response = response
+        self.raw = raw
+        self.remaining = int(length) if length is not None else None
+
+    def read(self, size=-1):
+        data = self.raw.read(size if size >= 0 else None)
+        if self.remaining is not None:
+            self.remaining -= len(data)
+            if not data and size and self.remaining > 0:
+                raise ConnectionError(f'connection closed, {self.remaining} bytes missing')
+        return data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.response.close()
+
+def _open(conanfile, url, timeout, verify):
+    if url.startswith('file:'):
+        response = urllib.request.urlopen(url)
+        return _Body(response, response)
+    # The conan requester applies the proxies, certificates and source credentials of the conf.
+    response = conanfile._conan_helpers.requester.get(url, stream=True, verify=verify, timeout=timeout,
+                                                      source_credentials=True)
+    try:
+        response.raise_for_status()
+    except Exception:
+        response.close()
+        raise
+    # Content-Length is the size on the wire: only checked when the body is not encoded.
+    length = None if response.headers.get('Content-Encoding') else response.headers.get('Content-Length')
+    response.raw.decode_content = True
+    return _Body(response, response.raw, length)
+
+# Errors worth another attempt: network errors (requests errors are OSError) and truncated bodies.
+_RETRIED_ERRORS = (OSError, http.client.HTTPException, urllib3.exceptions.HTTPError)
+
+def stream_get(conanfile, url, sha256=None, destination='.', filename='', pattern=None, strip_root=False,
+               extract_filter=None, tee=None, retry=None, timeout=None):
+    """
+    Download and extract an archive in a single pass: the HTTP body goes
+    through sha256 and the tar/zip extractor at the same time and is never
+    written to disk as a whole (unless `tee` is given).
+
+    Downloads go through the conan requester, like `conan.tools.files.get`.
+    The backup sources are not handled: `sources.get` falls back to conan
+    when they are configured.
+    """
+    urls = list(url) if isinstance(url, (list, tuple)) else [url]
+    filename = filename or os.path.basename(urls[0].split('?', 1)[0])
+    if extract_filter is None:
+        extract_filter = conanfile.conf.get('tools.files.unzip:filter')
+    if retry is None:
+        retry = conanfile.conf.get('tools.files.download:retry', check_type=int, default=2)
+    if timeout is None:
+        timeout = conanfile.conf.get('core.net.http:timeout', check_type=int, default=60)
+    retry_wait = conanfile.conf.get('tools.files.download:retry_wait', check_type=int, default=5)
+    verify = conanfile.conf.get('tools.files.download:verify', check_type=bool, default=True)
+
+    errors = []
+    for attempt in range(retry + 1):
+        if attempt:
+            time.sleep(retry_wait)
+        for candidate in urls:
+            if tee is not None:
+                tee.seek(0)
+                tee.truncate()
+            conanfile.output.info(f'Streaming {candidate}')
+            try:
+                with _open(conanfile, candidate, timeout, verify) as body:
+                    return extract_stream(conanfile, body, sha256, filename, destination, pattern,
+                                          strip_root, extract_filter, tee)
+            except _RETRIED_ERRORS as error:
+                # Only network errors are retried, not checksum mismatches.
+                errors.append(f'{candidate}: {error}')
+    raise ConanException(f'Cannot download {filename}: {"; ".join(errors)}')
@@ -0,0 +1,247 @@
+// Throughput and latency of cpp_redis against a running Redis server (or the resp_server.py stand-in).
+//
+//   - set_get: pipelined SET then GET in batches of `--pipeline` commands, latency from commit to reply,
+//   - pubsub: one publisher and `--subscribers` subscribers, latency from publish to delivery,
+//   - connect: connection churn, connect + PING + disconnect.
+// Results are printed and written as JSON.
+
+#include <cpp_redis/cpp_redis>
+
+#include <algorithm>
+#include <atomic>
+#include <chrono>
+#include <condition_variable>
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <fstream>
+#include <memory>
+#include <mutex>
+#include <sstream>
+#include <string>
+#include <vector>
+
+namespace {
+
+using clock_type = std::chrono::steady_clock;
+
+struct Result {
+    std::string name;
+    uint64_t operations;
+    double seconds;
+    std::vector<uint64_t> latencies; // nanoseconds
+};
+
+uint64_t now() {
+    return uint64_t(std::chrono::duration_cast<std::chrono::nanoseconds>(clock_type::now().time_since_epoch()).count());
+}
+
+[[noreturn]] void fail(const std::string& message) {
+    std::fprintf(stderr, "bench_package: %s\n", message.c_str());
+    std::exit(1);
+}
+
+// Counts down replies received on the io_service thread.
+class Countdown {
+public:
+    void reset(uint64_t count) {
+        std::lock_guard<std::mutex> lock(mutex_);
+        remaining_ = count;
+    }
+
+    void done() {
+        std::lock_guard<std::mutex> lock(mutex_);
+        if (remaining_ && --remaining_ == 0) condition_.notify_all();
+    }
+
+    bool wait(std::chrono::seconds timeout) {
+        std::unique_lock<std::mutex> lock(mutex_);
+        return condition_.wait_for(lock, timeout, [this] { return remaining_ == 0; });
+    }
+
+private:
+    std::mutex mutex_;
+    std::condition_variable condition_;
+    uint64_t remaining_ = 0;
+};
+
+constexpr std::chrono::seconds timeout{30};
+
+Result set_get(const std::string& host, std::size_t port, uint64_t operations, uint64_t pipeline, size_t value_size) {
+    cpp_redis::client client;
+    client.connect(host, port);
+
+    const std::string value(value_size, 'x');
+    Result result{"set_get", 0, 0, {}};
+    result.latencies.reserve(operations);
+    std::mutex latencies_mutex;
+    std::atomic<uint64_t> errors{0};
+    Countdown countdown;
+
+    auto start = now();
+    for (uint64_t sent = 0; sent < operations; sent += pipeline) {
+        const uint64_t batch = std::min(pipeline, operations - sent);
+        countdown.reset(batch);
+        const uint64_t committed = now();
+        for (uint64_t i = 0; i < batch; ++i) {
+            const std::string key = "bench:" + std::to_string((sent + i) / 2);
+            auto on_reply = [&, committed](cpp_redis::reply& reply) {
+                if (reply.is_error()) ++errors;
+                {
+                    std::lock_guard<std::mutex> lock(latencies_mutex);
+                    result.latencies.push_back(now() - committed);
+                }
+                countdown.done();
+            };
+            // Even operations write a key, odd ones read it back.
+            if ((sent + i) % 2 == 0)
+                client.set(key, value, on_reply);
+            else
+                client.get(key, on_reply);
+        }
+        client.commit();
+        if (!countdown.wait(timeout)) fail("set_get: timeout waiting for the replies");
+    }
+    result.seconds = double(now() - start) * 1e-9;
+    result.operations = operations;
+    if (errors) fail("set_get: " + std::to_string(errors.load()) + " error replies");
+    client.disconnect(true);
+    return result;
+}
+
+Result pubsub(const std::string& host, std::size_t port, uint64_t messages, uint64_t subscribers, size_t value_size) {
+    const std::string channel = "bench:channel";
+    Result result{"pubsub", 0, 0, {}};
+    result.latencies.reserve(messages * subscribers);
+    std::mutex latencies_mutex;
+    Countdown subscribed, delivered;
+
+    std::vector<std::unique_ptr<cpp_redis::subscriber>> subs;
+    subscribed.reset(subscribers);
+    for (uint64_t i = 0; i < subscribers; ++i) {
+        subs.emplace_back(new cpp_redis::subscriber);
+        subs.back()->connect(host, port);
+        subs.back()->subscribe(
+            channel,
+            [&](const std::string&, const std::string& message) {
+                // The message starts with its publish time.
+                const uint64_t published = std::strtoull(message.c_str(), nullptr, 10);
+                {
+                    std::lock_guard<std::mutex> lock(latencies_mutex);
+                    result.latencies.push_back(now() - published);
+                }
+                delivered.done();
+            },
+            [&](int64_t) { subscribed.done(); });
+        subs.back()->commit();
+    }
+    if (!subscribed.wait(timeout)) fail("pubsub: timeout waiting for the subscriptions");
+
+    cpp_redis::client publisher;
+    publisher.connect(host, port);
+    delivered.reset(messages * subscribers);
+    const std::string padding(value_size, 'x');
+
+    auto start = now();
+    for (uint64_t i = 0; i < messages; ++i) {
+        publisher.publish(channel, std::to_string(now()) + ":" + padding);
+        // Flush regularly so the publish time is close to the actual send.
+        if (i % 16 == 15) publisher.commit();
+    }
+    publisher.commit();
+    if (!delivered.wait(timeout)) fail("pubsub: timeout waiting for the messages");
+    result.seconds = double(now() - start) * 1e-9;
+    result.operations = messages * subscribers;
+
+    publisher.disconnect(true);
+    for (auto& sub : subs) sub->disconnect(true);
+    return result;
+}
+
+Result connect(const std::string& host, std::size_t port, uint64_t connections) {
+    Result result{"connect", 0, 0, {}};
+    result.latencies.reserve(connections);
+
+    auto start = now();
+    for (uint64_t i = 0; i < connections; ++i) {
+        const uint64_t begin = now();
+        cpp_redis::client client;
+        client.connect(host, port);
+        client.ping();
+        client.sync_commit(std::chrono::milliseconds(timeout));
+        client.disconnect(true);
+        result.latencies.push_back(now() - begin);
+    }
+    result.seconds = double(now() - start) * 1e-9;
+    result.operations = connections;
+    return result;
+}
+
+double percentile(std::vector<uint64_t>& values, double p) {
+    if (values.empty()) return 0;
+    std::sort(values.begin(), values.end());
+    return double(values[size_t(p * double(values.size() - 1))]) * 1e-3;
+}
+
+std::string json_string(const std::string& value) {
+    std::string out = "\"";
+    for (char c : value) out += (c == '"' || c == '\\') ? std::string("\\") + c : std::string(1, c);
+    return out + "\"";
+}
+
+} // namespace
+
+int main(int argc, char** argv) {
+    std::string host = "127.0.0.1", ref = "cpp_redis", options, server, output;
+    std::size_t port = 6379;
+    uint64_t operations = 100000, pipeline = 64, messages = 20000, subscribers = 4, connections = 500;
+    size_t value_size = 64;
+    for (int i = 1; i + 1 < argc; i += 2) {
+        std::string arg = argv[i], value = argv[i + 1];
+        if (arg == "--host") host = value;
+        else if (arg == "--port") port = std::stoul(value);
+        else if (arg == "--ref") ref = value;
+        else if (arg == "--options") options = value;
+        else if (arg == "--server") server = value;
+        else if (arg == "--output") output = value;
+        else if (arg == "--operations") operations = std::stoull(value);
+        else if (arg == "--pipeline") pipeline = std::max<uint64_t>(1, std::stoull(value));
+        else if (arg == "--messages") messages = std::stoull(value);
+        else if (arg == "--subscribers") subscribers = std::stoull(value);
+        else if (arg == "--connections") connections = std::stoull(value);
+        else if (arg == "--value-size") value_size = std::stoul(value);
+        else fail("unknown argument " + arg);
+    }
+
+    std::vector<Result> results;
+    results.push_back(set_get(host, port, operations, pipeline, value_size));
+    results.push_back(pubsub(host, port, messages, subscribers, value_size));
+    results.push_back(connect(host, port, connections));
+
+    std::ostringstream json;
+    json.setf(std::ios::fixed);
+    json.precision(3);
+    json << "{\n \"ref\": " << json_string(ref) << ",\n \"options\": " << json_string(options)
+         << ",\n \"server\": " << json_string(server) << ",\n \"pipeline\": " << pipeline
+         << ",\n \"subscribers\": " << subscribers << ",\n \"value_size\": " << value_size << ",\n \"results\": [";
+
+    std::printf("%-8s %10s %12s %10s %10s %10s\n", "bench", "ops", "ops/s", "p50 us", "p99 us", "max us");
+    for (size_t i = 0; i < results.size(); ++i) {
+        Result& r = results[i];
+        double rate = r.seconds > 0 ? double(r.operations) / r.seconds : 0;
+        double p50 = percentile(r.latencies, 0.50), p99 = percentile(r.latencies, 0.99);
+        double max = percentile(r.latencies, 1.0);
+        std::printf("%-8s %10llu %12.0f %10.1f %10.1f %10.1f\n", r.name.c_str(), (unsigned long long)r.operations,
+                    rate, p50, p99, max);
+        json << (i ? ",\n" : "\n") << "  {\"bench\": \"" << r.name << "\", \"operations\": " << r.operations
+             << ", \"ops_per_s\": " << rate << ", \"latency_us\": {\"p50\": " << p50 << ", \"p99\": " << p99
+             << ", \"max\": " << max << "}}";
+    }
+    json << "\n ]\n}\n";
+
+    if (!output.empty()) {
+        std::ofstream(output) << json.str();
+        std::printf("Results written to %s\n", output.c_str());
+    }
+    return 0;
+}
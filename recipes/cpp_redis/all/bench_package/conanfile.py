@@ -0,0 +1,83 @@
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+
+from conan import ConanFile
+from conan.errors import ConanException
+from conan.tools.build import can_run
+from conan.tools.cmake import CMake, cmake_layout
+
+
+class BenchPackageConan(ConanFile):
+    """
+    Client throughput and latency of cpp_redis, for the options of the tested package:
+
+        conan test recipes/cpp_redis/all/bench_package cpp_redis/4.3.1 \
+            -o cpp_redis/*:io_service_workers=4 -c user.cosmic:bench_output=/tmp/cpp_redis.json
+
+    The server is redis-server when it is on the PATH, resp_server.py otherwise. user.cosmic:bench_server
+    forces one of them ("redis-server" or "python").
+    """
+    settings = "os", "compiler", "build_type", "arch"
+    generators = "CMakeDeps", "CMakeToolchain", "VirtualRunEnv"
+    test_type = "explicit"
+
+    def requirements(self):
+        self.requires(self.tested_reference_str)
+
+    def layout(self):
+        cmake_layout(self)
+
+    def build(self):
+        cmake = CMake(self)
+        cmake.configure()
+        cmake.build()
+
+    def _server_command(self, port):
+        server = self.conf.get("user.cosmic:bench_server", default=None, check_type=str)
+        if server is None:
+            server = "redis-server" if shutil.which("redis-server") else "python"
+        if server == "redis-server":
+            return server, ["redis-server", "--port", str(port), "--bind", "127.0.0.1", "--save", "",
+                            "--appendonly", "no"]
+        if server == "python":
+            return server, [sys.executable, os.path.join(self.source_folder, "resp_server.py"), "--port", str(port)]
+        raise ConanException(f"user.cosmic:bench_server must be 'redis-server' or 'python', not '{server}'")
+
+    @staticmethod
+    def _wait_for(port, process, timeout=10):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise ConanException(f"The benchmark server exited with code {process.returncode}")
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                    return
+            except OSError:
+                time.sleep(0.1)
+        raise ConanException(f"The benchmark server is not listening on port {port}")
+
+    def test(self):
+        if not can_run(self):
+            return
+        dependency = self.dependencies[self.tested_reference_str.split("/")[0]]
+        options = ",".join(f"{name}={value}" for name, value in dependency.options.items())
+        output = self.conf.get("user.cosmic:bench_output", default=os.path.join(self.build_folder, "bench.json"))
+        operations = self.conf.get("user.cosmic:bench_operations", default=100000, check_type=int)
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        server, command = self._server_command(port)
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        try:
+            self._wait_for(port, process)
+            self.run(f'{os.path.join(self.cpp.build.bindirs[0], "bench_package")} --port {port} '
+                     f'--ref {dependency.ref} --options "{options}" --server {server} '
+                     f'--operations {operations} --output "{output}"', env="conanrun")
+        finally:
+            process.terminate()
+            process.wait()
@@ -0,0 +1,123 @@
+"""
+Minimal in-memory Redis stand-in for the cpp_redis benchmark, used when
+redis-server is not installed. It speaks RESP2 and implements the commands
+the benchmark sends: PING, ECHO, SET, GET, DEL, INCR, PUBLISH, SUBSCRIBE,
+UNSUBSCRIBE, SELECT and QUIT.
+
+    python3 resp_server.py --port 6400
+"""
+import argparse
+import asyncio
+
+class Server:
+    def __init__(self):
+        self.data = {}
+        self.channels = {}
+
+    def subscribers(self, channel):
+        return self.channels.setdefault(channel, set())
+
+    async def handle(self, reader, writer):
+        subscriptions = set()
+        try:
+            while True:
+                command = await read_command(reader)
+                if command is None:
+                    break
+                name = command[0].upper() if command else b''
+                if name == b'QUIT':
+                    writer.write(b'+OK\r\n')
+                    break
+                if name == b'SUBSCRIBE':
+                    for channel in command[1:]:
+                        subscriptions.add(channel)
+                        self.subscribers(channel).add(writer)
+                        writer.write(array([b'subscribe', channel, len(subscriptions)]))
+                elif name == b'UNSUBSCRIBE':
+                    for channel in command[1:] or list(subscriptions):
+                        subscriptions.discard(channel)
+                        self.subscribers(channel).discard(writer)
+                        writer.write(array([b'unsubscribe', channel, len(subscriptions)]))
+                else:
+                    writer.write(self.execute(name, command[1:]))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for channel in subscriptions:
+                self.subscribers(channel).discard(writer)
+            writer.close()
+
+    def execute(self, name, args):
+        if name == b'PING':
+            return bulk(args[0]) if args else b'+PONG\r\n'
+        if name == b'ECHO' and len(args) == 1:
+            return bulk(args[0])
+        if name == b'SET' and len(args) >= 2:
+            self.data[args[0]] = args[1]
+            return b'+OK\r\n'
+        if name == b'GET' and len(args) == 1:
+            return bulk(self.data.get(args[0]))
+        if name == b'DEL' and args:
+            return integer(sum(self.data.pop(key, None) is not None for key in args))
+        if name == b'INCR' and len(args) == 1:
+            try:
+                value = int(self.data.get(args[0], b'0')) + 1
+            except ValueError:
+                return b'-ERR value is not an integer or out of range\r\n'
+            self.data[args[0]] = str(value).encode()
+            return integer(value)
+        if name == b'PUBLISH' and len(args) == 2:
+            subscribers = self.subscribers(args[0])
+            message = array([b'message', args[0], args[1]])
+            for subscriber in subscribers:
+                subscriber.write(message)
+            return integer(len(subscribers))
+        if name == b'SELECT' and len(args) == 1:
+            return b'+OK\r\n'
+        return b'-ERR unknown command or wrong number of arguments\r\n'
+
+async def read_command(reader):
+    """Next command as a list of bytes, None at the end of the connection."""
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b'*'):
+        # Inline command, as sent by telnet or redis-cli without arguments.
+        return line.split()
+    command = []
+    for _ in range(int(line[1:])):
+        header = await reader.readline()
+        if not header.startswith(b'$'):
+            raise ConnectionError('protocol error')
+        command.append((await reader.readexactly(int(header[1:]) + 2))[:-2])
+    return command
+
+def bulk(value):
+    if value is None:
+        return b'$-1\r\n'
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+def integer(value):
+    return b':%d\r\n' % value
+
+def array(values):
+    return b'*%d\r\n' % len(values) + b''.join(integer(v) if isinstance(v, int) else bulk(v) for v in values)
+
+async def serve(host, port):
+    server = await asyncio.start_server(Server().handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,5 @@
 from conan import ConanFile
-from conan.tools.cmake import CMake
-from conan.tools.files import get
+from conan.errors import ConanInvalidConfiguration
 from copy import deepcopy
 from conan.tools.files import export_conandata_patches, apply_conandata_patches
 
@@ -10,16 +9,58 @@ class CppredisConan(ConanFile):
     url = 'https://github.com/offscale/conan-cpp_redis'
     description = 'Conan recipe for Cpp_Redis'
     settings = 'os', 'compiler', 'build_type', 'arch'
+    package_type = 'library'
+
+    # Removes fPIC when shared; CMakeToolchain passes them as BUILD_SHARED_LIBS and CMAKE_POSITION_INDEPENDENT_CODE.
+    implements = ['auto_shared_fpic']
 
     options = {
         'shared': [True, False],
         'fPIC': [True, False],
+        # Compiled in tacopie and cpp_redis, part of the package_id.
+        'io_service_workers': ['ANY'],     # Threads of the tacopie io_service (IO_SERVICE_NB_WORKERS)
+        'connection_queue_size': ['ANY'],  # listen() backlog of the tacopie servers (CONNECTION_QUEUE_SIZE)
+        'select_timeout': [None, 'ANY'],   # select() timeout of the io_service in microseconds, None blocks (SELECT_TIMEOUT)
+        'read_size': ['ANY'],              # Bytes read from a socket at once (READ_SIZE)
     }
     default_options = {
         'shared': False,
         'fPIC': True,
+        'io_service_workers': '1',
+        'connection_queue_size': '1024',
+        'select_timeout': None,
+        'read_size': '4096',
+    }
+
+    # CMake variable of each option, read by the tacopie and cpp_redis CMakeLists.
+    _cmake_options = {
+        'io_service_workers': 'IO_SERVICE_NB_WORKERS',
+        'connection_queue_size': 'CONNECTION_QUEUE_SIZE',
+        'select_timeout': 'SELECT_TIMEOUT',
+        'read_size': 'READ_SIZE',
     }
 
+    python_requires = 'cosmic_base/[>=1 <2]'
+    python_requires_extend = 'cosmic_base.CMakeRecipe'
+
+    def _cmake_values(self):
+        """(option, CMake variable, value) of the options that are set, select_timeout is None by default."""
+        for option, variable in self._cmake_options.items():
+            # get_safe returns an option value: an unset option compares as the 'None' string.
+            value = self.options.get_safe(option)
+            if value is not None and str(value) != 'None':
+                yield option, variable, str(value)
+
+    def validate(self):
+        super().validate()
+        for option, _, value in self._cmake_values():
+            if option == 'select_timeout' and value == '0':
+                # select() would return at once: the io_service threads would spin on the CPU.
+                raise ConanInvalidConfiguration('select_timeout=0 makes the io_service busy loop, '
+                                                'use None to block in select()')
+            if not value.isdigit() or int(value) < 1:
+                raise ConanInvalidConfiguration(f'{option} must be a positive integer, not {value}')
+
     def export_sources(self):
         export_conandata_patches(self)
 
@@ -28,8 +69,14 @@ class CppredisConan(ConanFile):
         redis = deepcopy(self.conan_data["sources"][self.version])
         tacopie = redis.pop('tacopie')
 
-        get(self, **redis, strip_root=True)
-        get(self, **tacopie, strip_root=True, destination='tacopie')
+        cosmic_base = self.python_requires['cosmic_base'].module
+        cosmic_base.get(self, **redis, strip_root=True)
+        cosmic_base.get(self, **tacopie, strip_root=True, destination='tacopie')
+
+        # Patched once: every configuration builds from the same sources.
+        apply_conandata_patches(self)
+
+    no_copy_source = True
 
 
     # def source(self):
@@ -38,19 +85,12 @@ class CppredisConan(ConanFile):
         # git.clone(url, f'{self.version}-beta.1', shallow=True)
         # self.run('cd cpp_redis && git submodule update --init --recursive')
 
-    generators = 'CMakeToolchain'
-
-    def build(self):
-        apply_conandata_patches(self)
-        cmake = CMake(self)
-
-        cmake.configure()
-        cmake.build()
-
-    def package(self):
-        cmake = CMake(self)
-        # Install headers and cmake files.
-        cmake.install()
+    def _configure_toolchain(self, tc):
+        # The io_service uses select(): the number of sockets is bounded by FD_SETSIZE, fixed by the libc.
+        for _, variable, value in self._cmake_values():
+            tc.cache_variables[variable] = int(value)
 
     def package_info(self):
         self.cpp_info.libs = ['cpp_redis','tacopie']
+        if self.settings.os in ('Linux', 'FreeBSD'):
+            self.cpp_info.system_libs = ['pthread']
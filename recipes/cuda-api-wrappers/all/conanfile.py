@@ -1,7 +1,7 @@
 import os
 
 from conan import ConanFile
-from conan.tools.files import get, copy
+from conan.tools.files import copy
 from conan.tools.layout import basic_layout
 
 required_conan_version = ">=1.52.0"
@@ -17,6 +17,7 @@ class CudaApiWrappersConan(ConanFile):
     package_type = "header-library"
     settings = "os", "arch", "compiler", "build_type"
     no_copy_source = True
+    python_requires = "cosmic_base/[>=1 <2]"
 
     def layout(self):
         basic_layout(self, src_folder="src")
@@ -25,7 +26,7 @@ class CudaApiWrappersConan(ConanFile):
         self.info.clear()
 
     def source(self):
-        get(self, **self.conan_data["sources"][self.version], strip_root=True)
+        self.python_requires["cosmic_base"].module.get(self, **self.conan_data["sources"][self.version], strip_root=True)
 
     def package(self):
         copy(
@@ -0,0 +1,131 @@
+import os
+
+from conan import ConanFile
+from conan.errors import ConanException, ConanInvalidConfiguration
+from conan.tools.cmake import CMake, cmake_layout
+from conan.tools.files import copy
+
+class EmuCudaConan(ConanFile):
+    name = 'emu-cuda'
+
+    license = 'MIT'
+    author = 'Julien Bernard jbernard@obspm.fr'
+    url = 'https://gitlab.obspm.fr/cosmic/tools/emu'
+    description = 'CUDA extension of emu, packaged on top of the emu core package'
+
+    settings = 'os', 'compiler', 'build_type', 'arch'
+
+    # Builds the cuda library of the emu sources (extracted in `emu/`) against the installed emu core.
+    exports_sources = 'CMakeLists.txt'
+
+    # Generate the logic between shared and fPic
+    implements = ['auto_shared_fpic']
+
+    options = {
+        'shared'        : [True, False], # Also applied to emu, both libraries are linked the same way
+        'fPIC'          : [True, False],
+        # Optimisation, part of the package_id.
+        'lto'           : [True, False], # Interprocedural optimisation (CMAKE_INTERPROCEDURAL_OPTIMIZATION)
+        'isa'           : [None, 'x86-64-v2', 'x86-64-v3', 'x86-64-v4', 'native'], # Host ISA level (-march)
+        'separable_compilation' : [True, False], # Relocatable device code (CUDA_SEPARABLE_COMPILATION)
+        'device_lto'            : [True, False], # Device link time optimisation (-dlto), needs separable_compilation
+        # Build speed only, not part of the package_id.
+        'unity_build'            : [True, False], # CMAKE_UNITY_BUILD
+        'unity_build_batch_size' : ['ANY'],       # Sources per unity file, 0 for all the target sources
+    }
+
+    default_options = {
+        'shared'     : False,
+        'fPIC'       : True,
+        'lto'        : False,
+        'isa'        : None,
+        'separable_compilation' : False,
+        'device_lto'            : False,
+        'unity_build'            : False,
+        'unity_build_batch_size' : '8',
+    }
+
+    def requirements(self):
+        data = self.conan_data['requirements'][self.version]
+
+        # emu core (and its own requirements) comes from the emu package, built once for CPU and CUDA consumers.
+        self.requires(f'emu/{self.version}', transitive_headers=True, transitive_libs=True,
+                      options={'shared': self.options.shared})
+        self.requires(data['cccl'], transitive_headers=True)
+
+        self.tool_requires(data['cmake'])
+        self.test_requires(data['gtest'])
+
+    python_requires = 'conan_cuda/[>=1 <2]', 'cosmic_base/[>=1 <2]'
+    python_requires_extend = 'cosmic_base.CMakeRecipe'
+
+    _cmake_cuda = True
+
+    def layout(self):
+        cmake_layout(self)
+        cuda_prop = self.python_requires['conan_cuda'].module.properties()
+
+        self.cpp.source.includedirs = ['emu/include/cuda', cuda_prop.include]
+        self.cpp.build.libdirs = [*self.cpp.build.libdirs, cuda_prop.library]
+        self.cpp.build.system_libs = ['cuda', 'cudart', 'cublas']
+
+    def validate(self):
+        super().validate()
+        if self.options.device_lto and not self.options.separable_compilation:
+            raise ConanInvalidConfiguration('device_lto requires separable_compilation=True')
+        if self.dependencies['emu'].options.cuda:
+            raise ConanInvalidConfiguration('emu/*:cuda=True already packages the cuda extension, '
+                                            'emu-cuda requires emu/*:cuda=False')
+
+    def source(self):
+        self.python_requires['cosmic_base'].module.get(self, **self.conan_data['sources'][self.version], strip_root=True,
+                                                       destination='emu')
+        if not os.path.isdir(os.path.join(self.source_folder, 'emu', 'src', 'cuda')):
+            raise ConanException(f'emu {self.version} has no src/cuda folder, CMakeLists.txt must be updated')
+
+    generators = 'CMakeDeps'
+
+    def _configure_toolchain(self, tc):
+        tc.cache_variables['BUILD_TESTING'] = self._run_tests
+
+        if self.options.separable_compilation:
+            tc.cache_variables['CMAKE_CUDA_SEPARABLE_COMPILATION'] = True
+            # Device link emucuda itself, so consumers do not need a device link step.
+            tc.cache_variables['CMAKE_CUDA_RESOLVE_DEVICE_SYMBOLS'] = True
+        if self.options.device_lto:
+            # Used by both the compilation and the device link.
+            flags = tc.variables.get('CMAKE_CUDA_FLAGS_INIT')
+            tc.variables['CMAKE_CUDA_FLAGS_INIT'] = f'{flags} -dlto' if flags else '-dlto'
+
+    def build(self):
+        super().build()
+
+        self._test(CMake(self))
+
+    def package(self):
+        super().package()
+
+        copy(self, 'LICENSE', os.path.join(self.source_folder, 'emu'), os.path.join(self.package_folder, 'licenses'))
+
+    def package_info(self):
+        # Same target as the former `cuda` component of emu.
+        self.cpp_info.set_property('cmake_file_name', 'emu-cuda')
+        self.cpp_info.set_property('cmake_target_name', 'emu::cuda')
+
+        cuda_prop = self.python_requires['conan_cuda'].module.properties()
+
+        self.cpp_info.libs = ['emucuda']
+        # Needed by the consumers of a static emucuda.
+        self.cpp_info.libdirs += [cuda_prop.library]
+        self.cpp_info.includedirs += [cuda_prop.include]
+        self.cpp_info.system_libs = ['cuda', 'cudart', 'cublas']
+        self.cpp_info.requires = [
+            'emu::core',
+            'cccl::cccl',
+        ]
+        #TODO: check if FMT_USE_CONSTEXPR is still needed to use {fmt} in .cu files
+        self.cpp_info.defines = ['EMU_CUDA', 'FMT_USE_CONSTEXPR=1']
+
+        if not self.options.shared:
+            # linker by default will not keep emu_cuda_device_pointer because it is not used explicitly.
+            self.cpp_info.exelinkflags = ['-Wl,-u,emu_cuda_device_pointer']
@@ -1,9 +1,10 @@
 import os
+import re
 
 from conan import ConanFile
-from conan.tools.cmake import CMakeToolchain, CMake, cmake_layout
-from conan.tools.files import copy, get
-from conan.tools.env import VirtualBuildEnv
+from conan.errors import ConanException
+from conan.tools.cmake import CMake, cmake_layout
+from conan.tools.files import copy
 
 class EmuConan(ConanFile):
     name = 'emu'
@@ -21,10 +22,17 @@ class EmuConan(ConanFile):
     implements = ['auto_shared_fpic']
 
     options = {
-        'cuda'          : [True, False], # Build the emu cuda extension
+        'cuda'          : [True, False], # Build the emu cuda extension, deprecated in favour of the emu-cuda package
         'python'        : [True, False], # Build the emu python tests, change nothing regarding the emu python extension
         'shared'        : [True, False],
         'fPIC'          : [True, False],
+        # Optimisation, part of the package_id: optimised and portable binaries coexist.
+        'lto'           : [True, False], # Interprocedural optimisation (CMAKE_INTERPROCEDURAL_OPTIMIZATION)
+        'isa'           : [None, 'x86-64-v2', 'x86-64-v3', 'x86-64-v4', 'native'], # Host ISA level (-march)
+        # Build speed only, not part of the package_id.
+        'unity_build'            : [True, False], # CMAKE_UNITY_BUILD
+        'unity_build_batch_size' : ['ANY'],       # Sources per unity file, 0 for all the target sources
+        'precompile_headers'     : [True, False], # Precompile the dependency headers listed in _precompiled_headers
     }
 
     default_options = {
@@ -32,13 +40,80 @@ class EmuConan(ConanFile):
         'python'     : False,
         'shared'     : False,
         'fPIC'       : True,
+        'lto'        : False,
+        'isa'        : None,
+        'unity_build'            : False,
+        'unity_build_batch_size' : '8',
+        'precompile_headers'     : False,
     }
 
+    # Dependency headers included by most of the C++ translation units.
+    _precompiled_headers = [
+        'fmt/format.h',
+        'gsl/gsl',
+        'mdspan/mdspan.hpp',
+        'tl/expected.hpp',
+        'tl/optional.hpp',
+    ]
+
+    # Compiled Boost libraries used by emu, with the ones they depend on. Every
+    # other library is disabled (`without_*`), and Boost is header-only when empty.
+    # None until the list is filled from the emu sources: the whole Boost is required.
+    _boost_components = None
+
+    # Compiled Boost libraries (`without_*` options of the boost recipe) and the
+    # headers requiring them, to check the sources only use declared components.
+    _boost_libraries = {
+        'atomic'          : ['boost/atomic'],
+        'charconv'        : ['boost/charconv'],
+        'chrono'          : ['boost/chrono'],
+        'cobalt'          : ['boost/cobalt'],
+        'container'       : ['boost/container/pmr'],
+        'context'         : ['boost/context'],
+        'contract'        : ['boost/contract'],
+        'coroutine'       : ['boost/coroutine'],
+        'date_time'       : ['boost/date_time'],
+        'exception'       : ['boost/exception_ptr.hpp', 'boost/exception/exception_ptr.hpp'],
+        'fiber'           : ['boost/fiber'],
+        'filesystem'      : ['boost/filesystem'],
+        'graph'           : ['boost/graph/graphviz.hpp'],
+        'graph_parallel'  : ['boost/graph/distributed'],
+        'iostreams'       : ['boost/iostreams'],
+        'json'            : ['boost/json'],
+        'locale'          : ['boost/locale'],
+        'log'             : ['boost/log'],
+        'math'            : ['boost/math/tr1.hpp'],
+        'mpi'             : ['boost/mpi'],
+        'nowide'          : ['boost/nowide'],
+        'process'         : ['boost/process'],
+        'program_options' : ['boost/program_options'],
+        'python'          : ['boost/python'],
+        'random'          : ['boost/random/random_device.hpp'],
+        'regex'           : ['boost/regex', 'boost/cregex.hpp'],
+        'serialization'   : ['boost/archive', 'boost/serialization'],
+        'stacktrace'      : ['boost/stacktrace'],
+        'test'            : ['boost/test'],
+        'thread'          : ['boost/thread'],
+        'timer'           : ['boost/timer'],
+        'type_erasure'    : ['boost/type_erasure'],
+        'url'             : ['boost/url'],
+        'wave'            : ['boost/wave'],
+    }
+
+    @property
+    def _boost_options(self):
+        if self._boost_components is None:
+            return {}
+        if not self._boost_components:
+            return {'header_only': True}
+        return {f'without_{library}': library not in self._boost_components for library in self._boost_libraries}
+
     def requirements(self):
         data = self.conan_data['requirements'][self.version]
 
         self.requires(data['fmt'], transitive_headers=True, transitive_libs=True)
-        self.requires(data['boost'], transitive_headers=True, transitive_libs=True)
+        self.requires(data['boost'], transitive_headers=True, transitive_libs=self._boost_components != [],
+                      options=self._boost_options)
         self.requires(data['ms-gsl'], transitive_headers=True)
         self.requires(data['mdspan'], transitive_headers=True)
         self.requires(data['half'], transitive_headers=True)
@@ -56,8 +131,9 @@ class EmuConan(ConanFile):
         self.tool_requires(data['cmake'])
         self.test_requires(data['gtest'])
 
-    # Cannot be optional (link to the use of cuda or not).
-    python_requires = 'conan_cuda/[>=1 <2]'
+    # conan_cuda cannot be optional (link to the use of cuda or not).
+    python_requires = 'conan_cuda/[>=1 <2]', 'cosmic_base/[>=1 <2]'
+    python_requires_extend = 'cosmic_base.CMakeRecipe'
 
     def layout(self):
         cmake_layout(self)
@@ -73,34 +149,62 @@ class EmuConan(ConanFile):
             self.cpp.build.components['cuda'].libdirs = [*self.cpp.build.libdirs, cuda_prop.library]
             self.cpp.build.components['cuda'].system_libs = ['cuda', 'cudart', 'cublas']
 
+    def validate(self):
+        super().validate()
+        if self.options.cuda:
+            self.output.warning(f'emu/*:cuda=True is deprecated, the emu-cuda/{self.version} package builds the cuda '
+                                'extension on top of the emu core package (see docs/build_performance.md)')
+
     def source(self):
-        get(self, **self.conan_data['sources'][self.version], strip_root=True)
+        self.python_requires['cosmic_base'].module.get(self, **self.conan_data['sources'][self.version], strip_root=True)
 
     generators = 'CMakeDeps'
 
-    def generate(self):
-        tc = CMakeToolchain(self)
+    def _check_boost_components(self):
+        """
+        Fail when the sources include a compiled Boost library missing from
+        `_boost_components`, only report the ones used while it is None.
+        """
+        # The tests are not installed, they do not change the libraries required by the consumers.
+        folders = ['include', 'src']
+        include = re.compile(r'#\s*include\s*[<"](boost/[^>"]+)[>"]')
+        used = {}
+        for folder in folders:
+            for root, _, files in os.walk(os.path.join(self.source_folder, folder)):
+                for name in files:
+                    path = os.path.join(root, name)
+                    with open(path, errors='ignore') as f:
+                        for header in include.findall(f.read()):
+                            for library, prefixes in self._boost_libraries.items():
+                                if any(header in (p, f'{p}.hpp') or header.startswith(f'{p}/') for p in prefixes):
+                                    used.setdefault(library, os.path.relpath(path, self.source_folder))
+        if self._boost_components is None:
+            self.output.info('emu uses the compiled Boost libraries: '
+                             + (', '.join(f'{library} ({used[library]})' for library in sorted(used)) or 'none'))
+            return
+        undeclared = sorted(set(used) - set(self._boost_components))
+        if undeclared:
+            raise ConanException('emu uses Boost libraries missing from _boost_components: '
+                                 + ', '.join(f'{library} ({used[library]})' for library in undeclared))
+
+    def _configure_toolchain(self, tc):
+        self._check_boost_components()
 
         tc.cache_variables['emu_build_cuda'] = self.options.cuda
         tc.cache_variables['emu_build_python_test'] = self.options.python
         tc.cache_variables['emu_boost_namespace'] = self.dependencies['boost'].options.namespace
-
-        tc.generate()
-        VirtualBuildEnv(self).generate()
+        # Consumers do not need the tests, only build them when they are run (`user.cosmic:run_tests`).
+        tc.cache_variables['BUILD_TESTING'] = self._run_tests
 
     def build(self):
-        cmake = CMake(self)
-
-        cmake.configure()
-        cmake.build()
+        super().build()
 
-        cmake.test()
+        self._test(CMake(self))
 
     def package(self):
         copy(self, 'LICENSE', self.source_folder, os.path.join(self.package_folder, 'licenses'))
 
-        cmake = CMake(self)
-        cmake.install()
+        super().package()
 
     def package_info(self):
         lib_location = 'lib' if self.settings.build_type == 'Release' else 'lib/debug'
@@ -116,6 +220,7 @@ class EmuConan(ConanFile):
             'tl-optional::tl-optional',
             'dlpack::dlpack',
             'boost::boost',
+            *(f'boost::{component}' for component in self._boost_components or []),
         ]
 
         self.cpp_info.components['core'].defines = ['EMU_BOOST_NAMESPACE={}'.format(self.dependencies['boost'].options.namespace)]
@@ -125,8 +230,12 @@ class EmuConan(ConanFile):
         self.cpp_info.components['python'].requires = ['core']
 
         if self.options.cuda:
+            cuda_prop = self.python_requires['conan_cuda'].module.properties()
+
             self.cpp_info.components['cuda'].libs = ['emucuda']
-            self.cpp_info.components['cuda'].libdirs = [lib_location]
+            self.cpp_info.components['cuda'].libdirs = [lib_location, cuda_prop.library]
+            self.cpp_info.components['cuda'].includedirs += [cuda_prop.include]
+            self.cpp_info.components['cuda'].system_libs = ['cuda', 'cudart', 'cublas']
             self.cpp_info.components['cuda'].requires = [
                 'core',
                 'cccl::cccl',
@@ -137,3 +246,4 @@ class EmuConan(ConanFile):
             if not self.options.shared:
                 # linker by default will not keep emu_cuda_device_pointer because it is not used explicitly.
                 self.cpp_info.components['cuda'].exelinkflags = ['-Wl,-u,emu_cuda_device_pointer']
+
@@ -0,0 +1,238 @@
+// Latency and throughput of ImageStreamIO streams between a producer and a consumer process.
+//
+// For each image size, a stream is created and a forked consumer waits on its semaphore:
+//   - latency: the producer writes a frame, posts and waits for the consumer to read it,
+//   - throughput: the producer writes frames as fast as it can, the consumer reads what it can.
+// The latency is the time between the frame write and the consumer wake up; in throughput mode
+// it includes the frames queued behind the semaphore. Results are printed and written as JSON.
+
+#include <ImageStreamIO/ImageStreamIO.h>
+
+#include <sys/wait.h>
+#include <time.h>
+#include <unistd.h>
+
+#include <algorithm>
+#include <cstdint>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <fstream>
+#include <sstream>
+#include <string>
+#include <vector>
+
+namespace {
+
+// Start of each frame: sequence number and write time.
+struct FrameHeader {
+    uint64_t sequence;
+    uint64_t timestamp;
+};
+
+constexpr uint64_t end_of_stream = UINT64_MAX;
+
+struct Result {
+    uint32_t size;
+    std::string mode;
+    uint64_t produced;
+    uint64_t received;
+    double seconds;
+    std::vector<uint64_t> latencies;
+};
+
+uint64_t now() {
+    timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return uint64_t(ts.tv_sec) * 1000000000 + uint64_t(ts.tv_nsec);
+}
+
+[[noreturn]] void fail(const std::string& message) {
+    std::fprintf(stderr, "bench_package: %s\n", message.c_str());
+    std::exit(1);
+}
+
+void write_all(int fd, const void* data, size_t size) {
+    auto bytes = static_cast<const char*>(data);
+    while (size) {
+        ssize_t n = write(fd, bytes, size);
+        if (n <= 0) fail("pipe write failed");
+        bytes += n;
+        size -= size_t(n);
+    }
+}
+
+void read_all(int fd, void* data, size_t size) {
+    auto bytes = static_cast<char*>(data);
+    while (size) {
+        ssize_t n = read(fd, bytes, size);
+        if (n <= 0) fail("pipe read failed");
+        bytes += n;
+        size -= size_t(n);
+    }
+}
+
+// Consumer process: read every posted frame until the end of stream, then send the latencies back.
+[[noreturn]] void consume(const std::string& name, bool acknowledge, int ready_fd, int ack_fd, int result_fd) {
+    IMAGE image;
+    if (ImageStreamIO_openIm(&image, name.c_str()) != IMAGESTREAMIO_SUCCESS) fail("cannot open " + name);
+    int semaphore = ImageStreamIO_getsemwaitindex(&image, 0);
+    const size_t frame_size = size_t(image.md->size[0]) * image.md->size[1];
+
+    char byte = 1;
+    write_all(ready_fd, &byte, 1);
+
+    std::vector<uint64_t> latencies;
+    uint64_t received = 0, last = end_of_stream;
+    volatile uint8_t sink = 0;
+    for (;;) {
+        ImageStreamIO_semwait(&image, semaphore);
+        FrameHeader header;
+        std::memcpy(&header, image.array.UI8, sizeof header);
+        if (header.sequence == end_of_stream) break;
+        if (header.sequence == last) continue;
+        latencies.push_back(now() - header.timestamp);
+
+        // Read the whole frame, as a real consumer would.
+        uint8_t sum = 0;
+        for (size_t i = sizeof header; i < frame_size; ++i) sum += image.array.UI8[i];
+        sink = sink + sum;
+
+        last = header.sequence;
+        ++received;
+        if (acknowledge) write_all(ack_fd, &byte, 1);
+    }
+
+    uint64_t count = latencies.size();
+    write_all(result_fd, &received, sizeof received);
+    write_all(result_fd, &count, sizeof count);
+    write_all(result_fd, latencies.data(), count * sizeof(uint64_t));
+    ImageStreamIO_closeIm(&image);
+    std::_Exit(0);
+}
+
+Result run(uint32_t size, uint64_t frames, bool paced, int semaphores) {
+    const std::string name = "bench_" + std::to_string(getpid()) + "_" + std::to_string(size);
+    uint32_t dims[2] = {size, size};
+    IMAGE image;
+    // Host image shared between processes, no keywords. The circular buffer size argument (0, none) only exists
+    // in the revisions detected by CMakeLists.txt.
+#ifdef BENCH_CREATE_WITH_CB_SIZE
+    errno_t status = ImageStreamIO_createIm_gpu(&image, name.c_str(), 2, dims, _DATATYPE_UINT8, -1, 1, semaphores, 0,
+                                                MATH_DATA, 0);
+#else
+    errno_t status = ImageStreamIO_createIm_gpu(&image, name.c_str(), 2, dims, _DATATYPE_UINT8, -1, 1, semaphores, 0,
+                                                MATH_DATA);
+#endif
+    if (status != IMAGESTREAMIO_SUCCESS) fail("cannot create " + name);
+    const size_t frame_size = size_t(size) * size;
+
+    int ready[2], ack[2], result[2];
+    if (pipe(ready) || pipe(ack) || pipe(result)) fail("pipe failed");
+    // Otherwise the consumer would print the buffered output again when it exits.
+    std::fflush(stdout);
+    pid_t pid = fork();
+    if (pid < 0) fail("fork failed");
+    if (pid == 0) {
+        for (int fd : {ready[0], ack[0], result[0]}) close(fd);
+        consume(name, paced, ready[1], ack[1], result[1]);
+    }
+    // Only the consumer holds the write ends: if it dies, the reads below fail instead of blocking.
+    for (int fd : {ready[1], ack[1], result[1]}) close(fd);
+
+    char byte;
+    read_all(ready[0], &byte, 1);
+
+    uint64_t start = now();
+    for (uint64_t sequence = 0; sequence < frames; ++sequence) {
+        std::memset(image.array.UI8 + sizeof(FrameHeader), int(sequence), frame_size - sizeof(FrameHeader));
+        FrameHeader header{sequence, now()};
+        std::memcpy(image.array.UI8, &header, sizeof header);
+        ImageStreamIO_UpdateIm(&image);
+        if (paced) read_all(ack[0], &byte, 1);
+    }
+    double seconds = double(now() - start) * 1e-9;
+
+    FrameHeader header{end_of_stream, now()};
+    std::memcpy(image.array.UI8, &header, sizeof header);
+    ImageStreamIO_UpdateIm(&image);
+
+    Result r{size, paced ? "latency" : "throughput", frames, 0, seconds, {}};
+    uint64_t count;
+    read_all(result[0], &r.received, sizeof r.received);
+    read_all(result[0], &count, sizeof count);
+    r.latencies.resize(count);
+    read_all(result[0], r.latencies.data(), count * sizeof(uint64_t));
+    waitpid(pid, nullptr, 0);
+
+    for (int fd : {ready[0], ack[0], result[0]}) close(fd);
+    ImageStreamIO_destroyIm(&image);
+    return r;
+}
+
+double percentile(std::vector<uint64_t>& values, double p) {
+    if (values.empty()) return 0;
+    std::sort(values.begin(), values.end());
+    return double(values[size_t(p * double(values.size() - 1))]) * 1e-3;
+}
+
+std::string json_string(const std::string& value) {
+    std::string out = "\"";
+    for (char c : value) out += (c == '"' || c == '\\') ? std::string("\\") + c : std::string(1, c);
+    return out + "\"";
+}
+
+} // namespace
+
+int main(int argc, char** argv) {
+    std::string ref = "imagestreamio", options, output, sizes = "16,64,256,1024";
+    uint64_t frames = 20000;
+    int semaphores = 10;
+    for (int i = 1; i + 1 < argc; i += 2) {
+        std::string arg = argv[i];
+        if (arg == "--ref") ref = argv[i + 1];
+        else if (arg == "--options") options = argv[i + 1];
+        else if (arg == "--output") output = argv[i + 1];
+        else if (arg == "--sizes") sizes = argv[i + 1];
+        else if (arg == "--frames") frames = std::strtoull(argv[i + 1], nullptr, 10);
+        else if (arg == "--semaphores") semaphores = std::atoi(argv[i + 1]);
+        else fail("unknown argument " + arg);
+    }
+
+    std::ostringstream json;
+    json.setf(std::ios::fixed);
+    json.precision(3);
+    json << "{\n \"ref\": " << json_string(ref) << ",\n \"options\": " << json_string(options)
+         << ",\n \"frames\": " << frames << ",\n \"results\": [";
+
+    std::printf("%-6s %-10s %12s %10s %10s %10s %10s\n", "size", "mode", "frames/s", "received", "p50 us", "p99 us",
+                "max us");
+    std::istringstream size_list(sizes);
+    std::string item;
+    bool first = true;
+    while (std::getline(size_list, item, ',')) {
+        uint32_t size = uint32_t(std::stoul(item));
+        if (size * size < sizeof(FrameHeader)) fail("image size " + item + " is too small");
+        for (bool paced : {true, false}) {
+            Result r = run(size, frames, paced, semaphores);
+            double rate = r.seconds > 0 ? double(r.produced) / r.seconds : 0;
+            double p50 = percentile(r.latencies, 0.50), p99 = percentile(r.latencies, 0.99);
+            double max = percentile(r.latencies, 1.0);
+            std::printf("%-6u %-10s %12.0f %10llu %10.1f %10.1f %10.1f\n", size, r.mode.c_str(), rate,
+                        (unsigned long long)r.received, p50, p99, max);
+
+            json << (first ? "\n" : ",\n") << "  {\"size\": " << size << ", \"bytes\": " << size * size
+                 << ", \"mode\": \"" << r.mode << "\", \"produced\": " << r.produced << ", \"received\": "
+                 << r.received << ", \"frames_per_s\": " << rate << ", \"latency_us\": {\"p50\": " << p50
+                 << ", \"p99\": " << p99 << ", \"max\": " << max << "}}";
+            first = false;
+        }
+    }
+    json << "\n ]\n}\n";
+
+    if (!output.empty()) {
+        std::ofstream(output) << json.str();
+        std::printf("Results written to %s\n", output.c_str());
+    }
+    return 0;
+}
@@ -0,0 +1,38 @@
+import os
+
+from conan import ConanFile
+from conan.tools.build import can_run
+from conan.tools.cmake import CMake, cmake_layout
+
+
+class BenchPackageConan(ConanFile):
+    """
+    Latency and throughput of ImageStreamIO streams, for the options of the tested package:
+
+        conan test recipes/imagestreamio/all/bench_package imagestreamio/20240906.0.0 \
+            -o imagestreamio/*:max_semaphore=100 -c user.cosmic:bench_output=/tmp/imagestreamio.json
+    """
+    settings = "os", "compiler", "build_type", "arch"
+    generators = "CMakeDeps", "CMakeToolchain", "VirtualRunEnv"
+    test_type = "explicit"
+
+    def requirements(self):
+        self.requires(self.tested_reference_str)
+
+    def layout(self):
+        cmake_layout(self)
+
+    def build(self):
+        cmake = CMake(self)
+        cmake.configure()
+        cmake.build()
+
+    def test(self):
+        if not can_run(self):
+            return
+        dependency = self.dependencies[self.tested_reference_str.split("/")[0]]
+        options = ",".join(f"{name}={value}" for name, value in dependency.options.items())
+        output = self.conf.get("user.cosmic:bench_output", default=os.path.join(self.build_folder, "bench.json"))
+        frames = self.conf.get("user.cosmic:bench_frames", default=20000, check_type=int)
+        self.run(f'{os.path.join(self.cpp.build.bindirs[0], "bench_package")} --ref {dependency.ref} '
+                 f'--options "{options}" --frames {frames} --output "{output}"', env="conanrun")
@@ -0,0 +1,87 @@
+from conan import ConanFile
+from conan.errors import ConanException
+from conan.tools.files import load, save
+import glob
+import os
+import re
+
+class ImageStreamIO(ConanFile):
+    name = 'imagestreamio'
+    homepage = 'https://github.com/milk-org/ImageStreamIO'
+    description = 'Shared memory image streams of milk, for the processes only streaming images'
+    topics = ('real-time', 'shared-memory', 'astronomy', 'image-processing')
+    url = 'https://github.com/milk-org/ImageStreamIO'
+    license = 'BSD-3-Clause'
+    settings = 'os', 'arch', 'compiler', 'build_type'
+
+    options = {
+        'cuda': [True, False],
+        'max_semaphore': ['ANY'],
+    }
+
+    default_options = {
+        'cuda': False,
+        'max_semaphore': '10',
+    }
+
+    # ImageStruct.h is only patched once in source(), the option values are compile
+    # definitions and are written in the packaged copy of the header.
+    no_copy_source = True
+
+    # Defines of ImageStruct.h set by the options, see _image_struct_defines.
+    _image_struct_names = ('GPU_IMAGE_PLACEHOLDER', 'SEMAPHORE_MAXVAL')
+
+    def source(self):
+        self.python_requires['cosmic_base'].module.get(self, **self.conan_data['sources'][self.version], strip_root=True)
+
+        # Let the compile definitions override the defaults of ImageStruct.h.
+        path = os.path.join(self.source_folder, 'ImageStruct.h')
+        header = load(self, path)
+        for name in self._image_struct_names:
+            header, count = re.subn(rf'^#define\s+{name}\s+.*$', rf'#ifndef {name}\n\g<0>\n#endif', header, flags=re.MULTILINE)
+            if count != 1:
+                raise ConanException(f'ImageStruct.h: cannot find the {name} definition')
+        save(self, path, header)
+
+    # conan_cuda cannot be optional (link to the use of cuda or not).
+    python_requires = 'conan_cuda/[>=1 <2]', 'cosmic_base/[>=1 <2]'
+    python_requires_extend = 'cosmic_base.CMakeRecipe'
+
+    @property
+    def _image_struct_defines(self):
+        defines = {'SEMAPHORE_MAXVAL': int(self.options.max_semaphore)}
+        if self.options.cuda:
+            defines['GPU_IMAGE_PLACEHOLDER'] = 128
+        return defines
+
+    def _configure_toolchain(self, tc):
+        tc.variables['build_python_module'] = False
+        tc.variables['USE_CUDA'] = self.options.cuda
+
+        for name, value in self._image_struct_defines.items():
+            tc.preprocessor_definitions[name] = value
+
+    def package(self):
+        super().package()
+
+        # The installed header holds the values of this package, consumers do not need the definitions.
+        for path in glob.glob(os.path.join(self.package_folder, 'include', '**', 'ImageStruct.h'), recursive=True):
+            header = load(self, path)
+            for name, value in self._image_struct_defines.items():
+                header = re.sub(rf'^(#define\s+{name}\s+).*$', rf'\g<1>{value}', header, flags=re.MULTILINE)
+            save(self, path, header)
+
+    def package_info(self):
+        self.cpp_info.set_property('cmake_file_name', 'ImageStreamIO')
+        self.cpp_info.set_property('cmake_target_name', 'ImageStreamIO::ImageStreamIO')
+
+        self.cpp_info.libs = [ 'ImageStreamIO' ]
+        self.cpp_info.system_libs = [ 'm', 'rt', 'pthread' ]
+
+        if self.options.cuda:
+            cuda_prop = self.python_requires['conan_cuda'].module.properties()
+
+            self.cpp_info.defines = ['HAVE_CUDA']
+            self.cpp_info.system_libs += ['cuda', 'cudart']
+            self.cpp_info.libdirs += [cuda_prop.library]
+            self.cpp_info.includedirs += [cuda_prop.include]
@@ -0,0 +1,7 @@
+#include <ImageStreamIO/ImageStreamIO.h>
+
+int main() {
+    IMAGE image;
+    (void)image;
+    return 0;
+}
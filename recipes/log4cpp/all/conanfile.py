@@ -1,6 +1,6 @@
 from conan import ConanFile
 
-from conan.tools.gnu import Autotools
+from conan.tools.gnu import Autotools, AutotoolsDeps, AutotoolsToolchain
 from conan.tools.files import get
 
 class Log4cppConan(ConanFile):
@@ -21,15 +21,23 @@ class Log4cppConan(ConanFile):
         'fPIC': True,
     }
 
+    python_requires = 'cosmic_base/[>=1 <2]'
+
     def source(self):
         get(self, **self.conan_data['sources'][self.version], strip_root=True, filename='log4cpp.tar.gz')
 
-    generators = 'AutotoolsDeps', 'AutotoolsToolchain'
+    def generate(self):
+        AutotoolsDeps(self).generate()
+
+        tc = AutotoolsToolchain(self)
+        env = self.python_requires['cosmic_base'].module.compiler_cache.autotools_launchers(self, tc)
+        tc.generate(env)
 
     def build(self):
         autotools = Autotools(self)
         autotools.configure(build_script_folder='log4cpp', args=['--enable-doxygen=no'])
-        autotools.make()
+        with self.python_requires['cosmic_base'].module.compiler_cache.statistics(self):
+            autotools.make()
 
     def package(self):
         autotools = Autotools(self)
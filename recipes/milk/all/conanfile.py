@@ -1,8 +1,7 @@
 from conan import ConanFile
-from conan.tools.cmake import CMake, CMakeToolchain
-from conan.tools.files import get, rmdir, replace_in_file
+from conan.errors import ConanInvalidConfiguration
+from conan.tools.files import rmdir, replace_in_file, save
 import os
-from copy import deepcopy
 
 class Milk(ConanFile):
     name = 'milk'
@@ -16,38 +15,46 @@ class Milk(ConanFile):
     options = {
         'cuda': [True, False],
         'magma': [True, False],
-        'max_semaphore': ['ANY'],
-        # 'file_io':       [True, False],
-        # 'cutensor':      [True, False],
-        # 'cutlass':       [True, False],
-        # 'visualization': [True, False],
-        # 'multi_gpu':     [True, False],
-        # 'nvtx':          [True, False],
-        # 'cub_cache':     [True, False],
-        # 'pybind11':      [True, False]
+        # Performance, part of the package_id.
+        'fast_math': [True, False],   # -ffast-math, and --use_fast_math for the CUDA code
+        'lto': [True, False],         # Interprocedural optimisation (CMAKE_INTERPROCEDURAL_OPTIMIZATION)
+        'isa': [None, 'x86-64-v2', 'x86-64-v3', 'x86-64-v4', 'native'], # Host ISA level (-march)
     }
 
     default_options = {
         'cuda': False,
         'magma': False,
-        'max_semaphore': '10',
-        # 'file_io':       False,
-        # 'cutensor':      False,
-        # 'cutlass':       False,
-        # 'visualization': False,
-        # 'multi_gpu':     False,
-        # 'nvtx':          False,
-        # 'cub_cache':     False,
-        # 'pybind11':      False
+        'fast_math': False,
+        'lto': False,
+        'isa': None,
     }
 
+    def requirements(self):
+        data = self.conan_data['requirements'][self.version]
+
+        # The image layout depends on cuda (GPU_IMAGE_PLACEHOLDER): milk and ImageStreamIO must agree.
+        self.requires(data['imagestreamio'], transitive_headers=True, transitive_libs=True,
+                      options={'cuda': self.options.cuda})
+
+    def validate(self):
+        super().validate()
+        # A consumer may force imagestreamio/*:cuda, which wins over the options given by requirements().
+        if self.dependencies['imagestreamio'].options.cuda != self.options.cuda:
+            raise ConanInvalidConfiguration(f'milk/*:cuda={self.options.cuda} requires imagestreamio/*:cuda={self.options.cuda}')
+
+    def package_id(self):
+        super().package_id()
+        # The options of imagestreamio (cuda, max_semaphore) change the ImageStruct.h layout milk is compiled with.
+        self.info.requires['imagestreamio'].full_package_mode()
+
     def source(self):
-        # Just in case, do not modify the original conan_data.
-        milk_data = deepcopy(self.conan_data["sources"][self.version])
-        image_stream_io_data = milk_data.pop('image_stream_io')
+        self.python_requires['cosmic_base'].module.get(self, **self.conan_data['sources'][self.version], strip_root=True)
 
-        get(self, **milk_data, strip_root=True)
-        get(self, **image_stream_io_data, strip_root=True, destination='src/ImageStreamIO')
+        # ImageStreamIO is built by its own recipe: the submodule folder only imports the package.
+        save(self, os.path.join(self.source_folder, 'src', 'ImageStreamIO', 'CMakeLists.txt'),
+             'find_package(ImageStreamIO REQUIRED CONFIG)\n'
+             'add_library(ImageStreamIO INTERFACE)\n'
+             'target_link_libraries(ImageStreamIO INTERFACE ImageStreamIO::ImageStreamIO)\n')
 
         rmdir(self, os.path.join(self.source_folder, 'plugins/milk-extra-src'))
 
@@ -56,60 +63,37 @@ class Milk(ConanFile):
             'milk -n ', 'milk -p 49 -n ')
 
 
-    # Cannot be optional (link to the use of cuda or not).
-    python_requires = 'conan_cuda/[>=1 <2]'
+    # conan_cuda cannot be optional (link to the use of cuda or not).
+    python_requires = 'conan_cuda/[>=1 <2]', 'cosmic_base/[>=1 <2]'
+    python_requires_extend = 'cosmic_base.CMakeRecipe'
 
-    def generate(self):
-        tc = CMakeToolchain(self)
+    generators = 'CMakeDeps'
 
+    def _configure_toolchain(self, tc):
         tc.variables['GIT_SUBMODULE'] = False
         tc.variables['build_python_module'] = False
 
         tc.variables['USE_CUDA'] = self.options.cuda
         tc.variables['USE_MAGMA'] = self.options.magma
 
-        tc.generate()
-
-    def build(self):
-        if self.options.cuda:
-            replace_in_file(self, os.path.join(self.source_folder, 'src', 'ImageStreamIO', 'ImageStruct.h'),
-                        'GPU_IMAGE_PLACEHOLDER    0', 'GPU_IMAGE_PLACEHOLDER  128')
-
-        max_semaphore = int(self.options.max_semaphore)
-        if max_semaphore != 10:
-            replace_in_file(self, os.path.join(self.source_folder, 'src', 'ImageStreamIO', 'ImageStruct.h'),
-                        'SEMAPHORE_MAXVAL        10', f'SEMAPHORE_MAXVAL {max_semaphore}')
-
-        cmake = CMake(self)
-
-        cmake.configure()
-        cmake.build()
-
-    def package(self):
-        cmake = CMake(self)
-        # Install headers and cmake files.
-        cmake.install()
+        if self.options.fast_math:
+            tc.extra_cflags.append('-ffast-math')
+            tc.extra_cxxflags.append('-ffast-math')
+            if self.options.cuda:
+                flags = tc.variables.get('CMAKE_CUDA_FLAGS_INIT')
+                tc.variables['CMAKE_CUDA_FLAGS_INIT'] = f'{flags} --use_fast_math' if flags else '--use_fast_math'
 
     def package_info(self):
         self.cpp_info.components['milk'].libs = [
             'CLIcore',
-            'ImageStreamIO',
             'milkCOREMODarith',
             'milkCOREMODiofits',
             'milkCOREMODmemory',
             'milkCOREMODtools',
         ]
         self.cpp_info.components['milk'].system_libs = [ 'm', 'readline', 'ncurses', 'cfitsio', 'dl', 'rt', 'gomp' ]
+        self.cpp_info.components['milk'].requires = [ 'imagestreamio::imagestreamio' ]
         # self.cpp_info.components['milk'].includedirs += [ 'include/CommandLineInterface' ]
 
-        self.cpp_info.components['ImageStreamIO'].libs = [ 'ImageStreamIO' ]
-        # self.cpp_info.components['ImageStreamIO'].includedirs += [
-        #     'include/ImageStreamIO'
-        # ]
-        if self.options.cuda:
-            cuda_prop = self.python_requires['conan_cuda'].module.properties()
-
-            self.cpp_info.components['ImageStreamIO'].defines = ['HAVE_CUDA']
-            self.cpp_info.components['ImageStreamIO'].system_libs = ['cuda', 'cudart']
-            self.cpp_info.components['ImageStreamIO'].libdirs += [cuda_prop.library]
-            self.cpp_info.components['ImageStreamIO'].includedirs += [cuda_prop.include]
+        # Kept for the consumers of milk::ImageStreamIO, the library comes from the imagestreamio package.
+        self.cpp_info.components['ImageStreamIO'].requires = [ 'imagestreamio::imagestreamio' ]
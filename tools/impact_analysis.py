@@ -0,0 +1,183 @@
+"""
+Compute which recipes of the index have to be rebuilt after a change.
+
+The reverse dependency graph is built from the requirements declared by every
+recipe version (see `recipe_index.py`). Version ranges are resolved against
+the versions listed in the index `config.yml` files, picking the highest
+match like conan does, so only the consumers that actually resolve to a
+changed version are reported. Requirements guarded by options
+(`if self.options.cuda:`) are reported with their condition.
+
+Usage:
+    python3 tools/impact_analysis.py cccl/3.1.0
+    python3 tools/impact_analysis.py conan_cuda --format json
+    python3 tools/impact_analysis.py --git-diff origin/main --format refs
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+from recipe_index import RecipeIndex, Version, default_root
+
+
+# Requirement kinds that change the binary of the consumer (package_id).
+BINARY_KINDS = ("requires", "python_requires")
+BUILD_KINDS = ("tool_requires", "test_requires")
+
+
+class Impact:
+    def __init__(self, name, version):
+        self.name = name
+        self.version = version
+        # Set of alternative conditions; an empty condition set means "always".
+        self.conditions = set()
+        self.reasons = []
+
+    @property
+    def ref(self):
+        return f"{self.name}/{self.version}"
+
+    @property
+    def unconditional(self):
+        return frozenset() in self.conditions
+
+    def add(self, conditions, reason):
+        conditions = frozenset(conditions)
+        if self.unconditional or conditions in self.conditions:
+            return False
+        if not conditions:
+            self.conditions = {conditions}
+        else:
+            self.conditions.add(conditions)
+        self.reasons.append(reason)
+        return True
+
+    def as_dict(self):
+        return {
+            "ref": self.ref,
+            "conditions": [] if self.unconditional else sorted(sorted(c) for c in self.conditions),
+            "reasons": self.reasons,
+        }
+
+
+def reverse_dependencies(index, kinds, all_in_range=False):
+    """
+       Map each `(name, version)` of the index to the list of
+       `(consumer_name, consumer_version, requirement)` that resolve to it.
+    """
+    graph = {}
+    for recipe, version in index.nodes():
+        requirements, unresolved = recipe.requirements(version)
+        for kind, expression, _ in unresolved:
+            print(f"warning: {recipe.name}/{version}: cannot evaluate {kind} `{expression}`", file=sys.stderr)
+        for requirement in requirements:
+            if requirement.kind not in kinds:
+                continue
+            ref = requirement.reference
+            if ref.name not in index:
+                continue
+            dependency = index[ref.name]
+            if all_in_range:
+                targets = [v for v in dependency.versions if ref.matches(v)]
+            else:
+                targets = [ref.resolve(dependency.versions)]
+            for target in filter(None, targets):
+                graph.setdefault((dependency.name, target), []).append((recipe.name, version, requirement))
+    return graph
+
+
+def parse_changed(index, values):
+    changed = set()
+    for value in values:
+        name, _, version = value.partition("/")
+        if name not in index:
+            raise argparse.ArgumentTypeError(f"{name} is not a recipe of the index")
+        recipe = index[name]
+        if version:
+            if version not in recipe.versions:
+                raise argparse.ArgumentTypeError(f"{name}/{version} is not listed in {name}/config.yml")
+            changed.add((recipe.name, version))
+        else:
+            changed.update((recipe.name, v) for v in recipe.versions)
+    return changed
+
+
+def changed_from_git(index, revision):
+    output = subprocess.check_output(
+        ["git", "diff", "--name-only", revision, "--", "recipes"], cwd=index.root, text=True)
+    return index.changed_from_paths(output.split())
+
+
+def analyse(index, changed, kinds=BINARY_KINDS, all_in_range=False):
+    graph = reverse_dependencies(index, kinds, all_in_range)
+
+    impacts = {}
+    queue = []
+    for name, version in sorted(changed):
+        impact = impacts.setdefault((name, version), Impact(name, version))
+        impact.add((), "changed")
+        queue.append((name, version))
+
+    while queue:
+        node = queue.pop(0)
+        for consumer, version, requirement in graph.get(node, []):
+            impact = impacts.setdefault((consumer, version), Impact(consumer, version))
+            reason = f"{requirement.kind} {requirement.ref} -> {node[0]}/{node[1]}"
+            if impact.add(requirement.conditions, reason) and (consumer, version) not in queue:
+                queue.append((consumer, version))
+
+    return [impacts[key] for key in sorted(impacts, key=lambda k: (k[0], Version(k[1])))]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="List the recipes of the index impacted by a change of some recipes."
+    )
+    parser.add_argument(
+        "changed",
+        nargs="*",
+        help="changed recipes, as `name` (every version) or `name/version`.",
+    )
+    parser.add_argument("--root", default=default_root(), help="root of the index (default: %(default)s).")
+    parser.add_argument("--git-diff", metavar="REV", help="also consider the recipes changed since REV.")
+    parser.add_argument(
+        "--include-build-requires",
+        action="store_true",
+        help="also follow tool_requires and test_requires (they do not change the package_id).",
+    )
+    parser.add_argument(
+        "--all-in-range",
+        action="store_true",
+        help="impact every consumer whose range contains a changed version, not only the ones resolving to it.",
+    )
+    parser.add_argument("--format", choices=["text", "json", "refs"], default="text")
+    args = parser.parse_args()
+
+    index = RecipeIndex(args.root)
+    try:
+        changed = parse_changed(index, args.changed)
+    except argparse.ArgumentTypeError as error:
+        parser.error(str(error))
+    if args.git_diff:
+        changed |= changed_from_git(index, args.git_diff)
+
+    kinds = BINARY_KINDS + (BUILD_KINDS if args.include_build_requires else ())
+    impacts = analyse(index, changed, kinds, args.all_in_range)
+
+    if args.format == "json":
+        print(json.dumps([impact.as_dict() for impact in impacts], indent=2))
+    elif args.format == "refs":
+        for impact in impacts:
+            print(impact.ref)
+    else:
+        width = max((len(impact.ref) for impact in impacts), default=0)
+        for impact in impacts:
+            conditions = "always" if impact.unconditional else \
+                " or ".join(" and ".join(sorted(c)) for c in sorted(impact.conditions, key=sorted))
+            print(f"{impact.ref:<{width}}  {conditions:<20}  {'; '.join(impact.reasons)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Machine readable manifest of the whole recipe index.
+
+The manifest is a single JSON file holding, for every recipe: its versions and
+folders, the sources listed in conandata (urls and checksums), the patches,
+the options declared by the recipe, the requirements and the sha256 of every
+file of the recipe. Regenerating it only re-parses the recipes whose files
+changed.
+
+Usage:
+    python3 tools/index_manifest.py generate
+    python3 tools/index_manifest.py generate --changed recipes/milk/all/conandata.yml
+    python3 tools/index_manifest.py query --name milk
+    python3 tools/index_manifest.py query --option cuda --requires cccl
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+from recipe_index import RECIPES_FOLDER, Recipe, default_root
+
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "index-manifest.json"
+
+# Local build leftovers (`conan create` test_package folders) are not part of the index.
+IGNORED_FOLDERS = ("__pycache__", "build")
+IGNORED_FILES = ("CMakeUserPresets.json",)
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def recipe_files(recipe_path):
+    """sha256 of every file of a recipe, keyed by their path relative to the recipe folder."""
+    files = {}
+    for folder, subfolders, filenames in os.walk(recipe_path):
+        subfolders[:] = sorted(d for d in subfolders if d not in IGNORED_FOLDERS)
+        for filename in sorted(f for f in filenames if f not in IGNORED_FILES and not f.endswith(".pyc")):
+            path = os.path.join(folder, filename)
+            files[os.path.relpath(path, recipe_path).replace(os.sep, "/")] = file_sha256(path)
+    return files
+
+
+def files_hash(files):
+    sha = hashlib.sha256()
+    for path, digest in sorted(files.items()):
+        sha.update(f"{digest}  {path}\n".encode())
+    return sha.hexdigest()
+
+
+def recipe_entry(root, name, files):
+    recipe = Recipe(root, name)
+    entry = {
+        "name": recipe.reference_name,
+        "hash": files_hash(files),
+        "files": files,
+        "folders": {},
+        "versions": {},
+    }
+    for version, folder_name in recipe.versions.items():
+        folder = recipe.folder(version)
+        if folder_name not in entry["folders"]:
+            entry["folders"][folder_name] = {
+                "options": {k: list(v) if isinstance(v, (list, tuple)) else v for k, v in folder.options.items()},
+                "default_options": folder.default_options,
+            }
+        requirements, _ = folder.requirements(version)
+        entry["versions"][version] = {
+            "folder": folder_name,
+            "sources": folder.sources(version),
+            "patches": [p.get("patch_file") if isinstance(p, dict) else p for p in folder.patches(version)],
+            "requirements": [r.as_dict() for r in requirements],
+        }
+    return entry
+
+
+def generate(root, previous=None, changed=None):
+    """
+       Build the manifest, reusing the entries of `previous` for the recipes
+       whose files did not change. When `changed` (paths relative to the
+       root) is given, only those recipes are looked at.
+    """
+    previous = (previous or {}).get("recipes", {}) if (previous or {}).get("format") == FORMAT_VERSION else {}
+    recipes_path = os.path.join(root, RECIPES_FOLDER)
+    names = sorted(n for n in os.listdir(recipes_path) if os.path.isfile(os.path.join(recipes_path, n, "config.yml")))
+
+    if changed is not None:
+        touched = set()
+        for path in changed:
+            parts = os.path.normpath(path).split(os.sep)
+            if len(parts) >= 2 and parts[0] == RECIPES_FOLDER:
+                touched.add(parts[1])
+    else:
+        touched = set(names)
+
+    recipes = {}
+    regenerated = []
+    for name in names:
+        if name not in touched and name in previous:
+            recipes[name] = previous[name]
+            continue
+        files = recipe_files(os.path.join(recipes_path, name))
+        if name in previous and previous[name]["hash"] == files_hash(files):
+            recipes[name] = previous[name]
+            continue
+        recipes[name] = recipe_entry(root, name, files)
+        regenerated.append(name)
+
+    return {"format": FORMAT_VERSION, "recipes": recipes}, regenerated
+
+
+#########
+# QUERY #
+#########
+
+class ManifestIndex:
+    """
+       In memory inverted index over a manifest: every `(field, value)` maps
+       to the set of `name/version` having it.
+    """
+
+    def __init__(self, manifest):
+        self.manifest = manifest
+        self.inverted = {}
+        for folder_name, recipe in manifest["recipes"].items():
+            for version, data in recipe["versions"].items():
+                ref = f"{recipe['name']}/{version}"
+                self._add("name", recipe["name"], ref)
+                self._add("name", folder_name, ref)
+                self._add("version", version, ref)
+                for option in recipe["folders"][data["folder"]]["options"]:
+                    self._add("option", option, ref)
+                for requirement in data["requirements"]:
+                    self._add("requires", requirement["ref"].split("/", 1)[0], ref)
+                for source in data["sources"]:
+                    for checksum in ("sha256", "sha1", "md5"):
+                        if checksum in source:
+                            self._add("checksum", source[checksum], ref)
+
+    def _add(self, field, value, ref):
+        self.inverted.setdefault((field, str(value)), set()).add(ref)
+
+    def lookup(self, **criteria):
+        """Intersection of the refs matching every `field=value` criterion."""
+        result = None
+        for field, value in criteria.items():
+            refs = self.inverted.get((field, str(value)), set())
+            result = refs if result is None else result & refs
+        return set() if result is None else result
+
+    def describe(self, ref):
+        name, version = ref.split("/", 1)
+        for folder_name, recipe in self.manifest["recipes"].items():
+            if recipe["name"] == name and version in recipe["versions"]:
+                data = recipe["versions"][version]
+                return dict(data, ref=ref, path=f"{RECIPES_FOLDER}/{folder_name}/{data['folder']}")
+        return None
+
+
+def read_manifest(path):
+    if not os.path.isfile(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(manifest, path):
+    # Written next to the destination and renamed so readers never see a partial file.
+    # One key per line keeps the diffs of the published manifest readable.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, sort_keys=True, indent=1, separators=(",", ":"))
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and query the manifest of the index.")
+    parser.add_argument("--root", default=default_root(), help="root of the index (default: %(default)s).")
+    parser.add_argument("--manifest", help=f"manifest path (default: <root>/{MANIFEST_FILE}).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = subparsers.add_parser("generate", help="(re)generate the manifest.")
+    generate_parser.add_argument(
+        "--changed", nargs="*", metavar="PATH",
+        help="only look at the recipes owning these paths (relative to the root).")
+    generate_parser.add_argument("--full", action="store_true", help="ignore the existing manifest.")
+
+    query_parser = subparsers.add_parser("query", help="look up recipe versions.")
+    query_parser.add_argument("--name", help="recipe name.")
+    query_parser.add_argument("--version", help="recipe version.")
+    query_parser.add_argument("--option", help="declared option.")
+    query_parser.add_argument("--requires", help="name of a requirement.")
+    query_parser.add_argument("--checksum", help="source checksum.")
+    query_parser.add_argument("--json", action="store_true", help="print the full entries.")
+    query_parser.add_argument("--time", action="store_true", help="print the lookup time on stderr.")
+
+    args = parser.parse_args()
+    manifest_path = args.manifest or os.path.join(args.root, MANIFEST_FILE)
+
+    if args.command == "generate":
+        previous = None if args.full else read_manifest(manifest_path)
+        manifest, regenerated = generate(args.root, previous, args.changed)
+        write_manifest(manifest, manifest_path)
+        print(f"{manifest_path}: regenerated {', '.join(regenerated) or 'nothing'}", file=sys.stderr)
+        return
+
+    manifest = read_manifest(manifest_path)
+    if manifest is None:
+        parser.error(f"{manifest_path} does not exist, run the `generate` command first")
+
+    criteria = {field: getattr(args, field) for field in ("name", "version", "option", "requires", "checksum")
+                if getattr(args, field) is not None}
+    if not criteria:
+        parser.error("at least one criterion is required")
+
+    index = ManifestIndex(manifest)
+    start = time.perf_counter()
+    refs = index.lookup(**criteria)
+    elapsed = time.perf_counter() - start
+
+    entries = [index.describe(ref) for ref in sorted(refs)]
+    if args.json:
+        print(json.dumps(entries, indent=2))
+    else:
+        for entry in entries:
+            print(f"{entry['ref']}  {entry['path']}")
+    if args.time:
+        print(f"{len(refs)} result(s) in {elapsed * 1e6:.1f} us", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Incremental synchronisation of a local copy of the index.
+
+The published `index-manifest.json` lists the sha256 of every file of every
+recipe. Only the files that differ from the local copy are downloaded, each
+one is verified against the manifest and a recipe folder is only replaced
+once all its files are available. Recipes removed from the index are removed
+locally.
+
+The files are fetched from `<base-url>/<path>`, so any static HTTP server
+exposing a checkout of the index can be used, e.g. for tests:
+
+    python3 -m http.server --directory /path/to/cosmic-center-index 8000
+    python3 tools/index_sync.py --index-location /tmp/index --base-url http://localhost:8000
+
+Usage:
+    python3 tools/index_sync.py --index-location ~/.conan2/cosmic-local-index
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from index_manifest import MANIFEST_FILE, files_hash, recipe_files, write_manifest
+from recipe_index import RECIPES_FOLDER
+
+
+DEFAULT_BASE_URL = "https://raw.githubusercontent.com/raplonu/cosmic-center-index/refs/heads/main"
+
+
+class SyncError(Exception):
+    pass
+
+
+def fetch(url, timeout=30, retries=3):
+    for attempt in range(retries):
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                return response.read()
+        except (urllib.error.URLError, OSError) as error:
+            if attempt + 1 == retries:
+                raise SyncError(f"cannot download {url}: {error}")
+            time.sleep(2 ** attempt)
+
+
+def fetch_verified(base_url, path, sha256):
+    data = fetch(f"{base_url}/{urllib.parse.quote(path)}")
+    digest = hashlib.sha256(data).hexdigest()
+    if digest != sha256:
+        raise SyncError(f"{path}: sha256 mismatch, expected {sha256} got {digest}")
+    return data
+
+
+def plan(manifest, index_location):
+    """
+       Compare the manifest with the local index. Return the recipes to update
+       as `{name: local_files}` and the local recipes to remove.
+    """
+    recipes_path = os.path.join(index_location, RECIPES_FOLDER)
+    changed = {}
+    for name, entry in manifest["recipes"].items():
+        if files_hash(entry["files"]) != entry["hash"]:
+            raise SyncError(f"{MANIFEST_FILE}: inconsistent entry for {name}")
+        local_path = os.path.join(recipes_path, name)
+        local_files = recipe_files(local_path) if os.path.isdir(local_path) else {}
+        if files_hash(local_files) != entry["hash"]:
+            changed[name] = local_files
+
+    removed = []
+    if os.path.isdir(recipes_path):
+        removed = sorted(n for n in os.listdir(recipes_path)
+                         if not n.startswith(".") and n not in manifest["recipes"]
+                         and os.path.isdir(os.path.join(recipes_path, n)))
+    return changed, removed
+
+
+def _replace_folder(staging, destination):
+    old = None
+    if os.path.exists(destination):
+        old = os.path.join(os.path.dirname(destination), f".{os.path.basename(destination)}.old")
+        shutil.rmtree(old, ignore_errors=True)
+        os.rename(destination, old)
+    os.rename(staging, destination)
+    if old:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def sync(manifest, index_location, base_url, jobs=8, dry_run=False):
+    changed, removed = plan(manifest, index_location)
+    recipes_path = os.path.join(index_location, RECIPES_FOLDER)
+
+    downloads = [
+        (name, path, sha256)
+        for name, local_files in changed.items()
+        for path, sha256 in manifest["recipes"][name]["files"].items()
+        if local_files.get(path) != sha256
+    ]
+
+    if dry_run:
+        for name, path, _ in downloads:
+            print(f"download {RECIPES_FOLDER}/{name}/{path}")
+        for name in removed:
+            print(f"remove {RECIPES_FOLDER}/{name}")
+        return changed, removed, 0
+
+    # Every file is downloaded and verified before anything is touched.
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        contents = dict(zip(
+            ((name, path) for name, path, _ in downloads),
+            executor.map(lambda d: fetch_verified(base_url, f"{RECIPES_FOLDER}/{d[0]}/{d[1]}", d[2]), downloads),
+        ))
+
+    os.makedirs(recipes_path, exist_ok=True)
+    for name, local_files in changed.items():
+        staging = os.path.join(recipes_path, f".{name}.sync")
+        shutil.rmtree(staging, ignore_errors=True)
+        for path, sha256 in manifest["recipes"][name]["files"].items():
+            destination = os.path.join(staging, *path.split("/"))
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            if (name, path) in contents:
+                with open(destination, "wb") as f:
+                    f.write(contents[(name, path)])
+            else:
+                shutil.copy2(os.path.join(recipes_path, name, *path.split("/")), destination)
+        _replace_folder(staging, os.path.join(recipes_path, name))
+
+    for name in removed:
+        shutil.rmtree(os.path.join(recipes_path, name))
+
+    write_manifest(manifest, os.path.join(index_location, MANIFEST_FILE))
+    return changed, removed, sum(len(data) for data in contents.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally synchronise a local copy of the index.")
+    parser.add_argument("--index-location", required=True, help="local copy of the index.")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="where the index is published (default: %(default)s).")
+    parser.add_argument("-j", "--jobs", type=int, default=8, help="parallel downloads (default: %(default)s).")
+    parser.add_argument("--dry-run", action="store_true", help="only print what would be done.")
+    args = parser.parse_args()
+
+    base_url = args.base_url.rstrip("/")
+    try:
+        manifest = json.loads(fetch(f"{base_url}/{MANIFEST_FILE}"))
+        changed, removed, transferred = sync(manifest, args.index_location, base_url, args.jobs, args.dry_run)
+    except (SyncError, ValueError, KeyError) as error:
+        print(f"error: {error}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"updated: {', '.join(sorted(changed)) or 'none'}; removed: {', '.join(removed) or 'none'}; "
+          f"downloaded {transferred} bytes")
+
+
+if __name__ == "__main__":
+    main()
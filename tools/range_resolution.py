@@ -0,0 +1,219 @@
+"""
+Precompute the resolution of every version range used by the index.
+
+Conan queries every remote to resolve a range such as `cmake/[>=3.23 <4]`.
+On machines without network access (or with a slow one) it is faster to
+resolve the ranges once, against a snapshot of the versions available on the
+remotes, and to hand conan a lockfile.
+
+Usage:
+    # 1. Snapshot the versions available on the remotes (needs network).
+    conan list "*/*#latest" -r conancenter --format json > conancenter.json
+    python3 tools/range_resolution.py snapshot conancenter.json -o snapshot.json
+
+    # 2. Resolve every range of the index against the snapshot and the index itself.
+    python3 tools/range_resolution.py table snapshot.json -o resolution.json
+
+    # 3. Lock the transitive requirements of the external packages as well (needs network).
+    conan lock create --requires emu/0.1.0-rc.6 --lockfile-out graph.lock
+
+    # 4. Generate a conan lockfile from the table and the graph lockfile (no network needed from here).
+    python3 tools/range_resolution.py lock resolution.json --seed graph.lock -o cosmic.lock
+    conan install --requires emu/0.1.0-rc.6 --lockfile cosmic.lock
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+
+from recipe_index import RecipeIndex, Reference, Version, default_root, file_path
+
+
+FORMAT_VERSION = 1
+LOCKFILE_VERSION = "0.5"
+
+# Lockfile section for each requirement kind.
+LOCKFILE_SECTIONS = {
+    "requires": "requires",
+    "test_requires": "requires",
+    "tool_requires": "build_requires",
+    "python_requires": "python_requires",
+}
+
+
+def _write_json(data, output):
+    content = json.dumps(data, indent=2, sort_keys=True) + "\n"
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(content)
+    else:
+        sys.stdout.write(content)
+
+
+def _read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+############
+# SNAPSHOT #
+############
+
+def snapshot_from_conan_list(listings):
+    """
+       Merge the output of `conan list --format json` for several remotes.
+       Like conan, the first remote providing a version wins.
+    """
+    packages = {}
+    for listing in listings:
+        for remote, refs in listing.items():
+            if not isinstance(refs, dict) or "error" in refs:
+                continue
+            for ref, content in refs.items():
+                name, _, version = ref.partition("/")
+                entry = packages.setdefault(name, {})
+                if version in entry:
+                    continue
+                revision = None
+                revisions = (content or {}).get("revisions") or {}
+                if revisions:
+                    revision, data = max(revisions.items(), key=lambda item: item[1].get("timestamp") or 0)
+                    revision = {"revision": revision, "timestamp": data.get("timestamp")}
+                entry[version] = dict(revision or {}, remote=remote)
+    return {"format": FORMAT_VERSION, "packages": packages}
+
+
+#########
+# TABLE #
+#########
+
+def _index_fingerprint(index):
+    """Hash of the index files a resolution depends on."""
+    sha = hashlib.sha256()
+    for recipe, version in index.nodes():
+        sha.update(f"{recipe.name}/{version}:{recipe.versions[version]}\n".encode())
+        folder = recipe.folder(version)
+        for name in ("conanfile.py", "conandata.yml"):
+            try:
+                with open(f"{folder.path}/{name}", "rb") as f:
+                    sha.update(f.read())
+            except FileNotFoundError:
+                pass
+    return sha.hexdigest()
+
+
+def resolution_table(index, snapshot):
+    """
+       Resolve every requirement of every recipe version of the index. The
+       index versions take precedence over the snapshot, like a
+       `local-recipes-index` remote listed first.
+    """
+    available = {name: dict(versions) for name, versions in snapshot.get("packages", {}).items()}
+    for recipe in index:
+        for version in recipe.versions:
+            available.setdefault(recipe.reference_name, {})[version] = {"remote": "index"}
+
+    ranges = {}
+    unresolved = {}
+    for recipe, version in index.nodes():
+        requirements, _ = recipe.requirements(version)
+        for requirement in requirements:
+            ref = requirement.reference
+            versions = available.get(ref.name, {})
+            resolved = ref.resolve(versions)
+            kinds = ranges.get(requirement.ref, {}).get("kinds", []) + [requirement.kind]
+            if resolved is None:
+                unresolved.setdefault(requirement.ref, []).append(f"{recipe.name}/{version}")
+                continue
+            ranges[requirement.ref] = dict(versions[resolved], ref=f"{ref.name}/{resolved}", kinds=sorted(set(kinds)))
+
+    sha = hashlib.sha256()
+    sha.update(_index_fingerprint(index).encode())
+    sha.update(json.dumps(snapshot, sort_keys=True).encode())
+
+    return {
+        "format": FORMAT_VERSION,
+        "id": sha.hexdigest(),
+        "ranges": ranges,
+        "unresolved": unresolved,
+    }
+
+
+############
+# LOCKFILE #
+############
+
+def lockfile(table, seed=None):
+    """
+       Build a conan lockfile pinning every resolved reference of the table.
+       Revisions are only pinned when the snapshot recorded them.
+
+       The table only covers the requirements declared by the index recipes.
+       `seed` is a lockfile of `conan lock create`, whose entries lock the
+       rest of the graph (the requirements of the external packages); for a
+       reference in both, the table entry wins.
+    """
+    sections = {"requires": set(), "build_requires": set(), "python_requires": set()}
+    for section, refs in sections.items():
+        refs.update((seed or {}).get(section, []))
+    for resolution in table["ranges"].values():
+        ref = resolution["ref"]
+        if resolution.get("revision"):
+            ref += f"#{resolution['revision']}"
+            if resolution.get("timestamp") is not None:
+                ref += f"%{resolution['timestamp']}"
+        for kind in resolution["kinds"]:
+            refs = sections[LOCKFILE_SECTIONS[kind]]
+            refs.difference_update([r for r in refs if r.split("#", 1)[0] == resolution["ref"]])
+            refs.add(ref)
+
+    def ordered(refs):
+        # conan keeps lockfile entries sorted from newest to oldest.
+        return sorted(refs, key=lambda r: (Reference(r).name, Version(Reference(r).version)), reverse=True)
+
+    return dict(
+        {"version": LOCKFILE_VERSION, "config_requires": []},
+        **{section: ordered(refs) for section, refs in sections.items()},
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precompute version range resolutions of the index and generate conan lockfiles."
+    )
+    parser.add_argument("--root", default=default_root(), help="root of the index (default: %(default)s).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    snapshot_parser = subparsers.add_parser("snapshot", help="merge `conan list --format json` outputs.")
+    snapshot_parser.add_argument("listings", nargs="+", type=file_path, help="conan list outputs, by remote priority.")
+    snapshot_parser.add_argument("-o", "--output", help="output file (default: stdout).")
+
+    table_parser = subparsers.add_parser("table", help="resolve every range of the index.")
+    table_parser.add_argument("snapshot", type=file_path, help="snapshot generated by the `snapshot` command.")
+    table_parser.add_argument("-o", "--output", help="output file (default: stdout).")
+
+    lock_parser = subparsers.add_parser("lock", help="generate a conan lockfile from a resolution table.")
+    lock_parser.add_argument("table", type=file_path, help="table generated by the `table` command.")
+    lock_parser.add_argument("--seed", type=file_path,
+                             help="lockfile of `conan lock create`, locking the requirements of the external packages.")
+    lock_parser.add_argument("-o", "--output", help="output file (default: stdout).")
+
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        _write_json(snapshot_from_conan_list([_read_json(path) for path in args.listings]), args.output)
+    elif args.command == "table":
+        table = resolution_table(RecipeIndex(args.root), _read_json(args.snapshot))
+        for ref, consumers in table["unresolved"].items():
+            print(f"warning: {ref} (required by {', '.join(consumers)}) is not in the snapshot", file=sys.stderr)
+        _write_json(table, args.output)
+    elif args.command == "lock":
+        table = _read_json(args.table)
+        if table.get("format") != FORMAT_VERSION:
+            parser.error(f"{args.table}: unsupported resolution table format {table.get('format')}")
+        _write_json(lockfile(table, _read_json(args.seed) if args.seed else None), args.output)
+
+
+if __name__ == "__main__":
+    main()
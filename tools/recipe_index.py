@@ -0,0 +1,545 @@
+"""
+Helpers to read the recipe index without loading conan.
+
+The recipes are never imported: `config.yml` and `conandata.yml` are read with
+PyYAML and each `conanfile.py` is inspected with `ast` to recover its
+requirements. This keeps the tools usable on machines where the recipes'
+python dependencies (conan, conan_cuda, ...) are not installed.
+"""
+
+import argparse
+import ast
+import os
+import re
+import sys
+
+import yaml
+
+
+RECIPES_FOLDER = "recipes"
+
+REQUIREMENT_METHODS = {
+    "requires": "requires",
+    "tool_requires": "tool_requires",
+    "build_requires": "tool_requires",
+    "test_requires": "test_requires",
+    "python_requires": "python_requires",
+}
+
+
+def default_root():
+    # tools/ lives at the root of the index.
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def file_path(a_string):
+    if not os.path.isfile(a_string):
+        raise argparse.ArgumentTypeError(f"{a_string} does not point to a file")
+    return a_string
+
+
+def load_yaml(path):
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+###########
+# VERSION #
+###########
+
+def _version_items(value):
+    items = []
+    for item in value.split("."):
+        if item.isdigit():
+            items.append((0, int(item), ""))
+        else:
+            items.append((1, 0, item))
+    # "1.0" and "1" are the same version for conan.
+    while len(items) > 1 and items[-1] == (0, 0, ""):
+        items.pop()
+    return tuple(items)
+
+
+class Version:
+    """
+       Version ordering following conan's rules: dot separated items compared
+       numerically when possible, pre-releases (`-xxx`) sort before the
+       release and build metadata (`+xxx`) is ignored. A bare `-` (`2-`) is
+       the lowest pre-release of its version, as used by range bounds.
+    """
+
+    def __init__(self, value):
+        self.value = str(value)
+        main = self.value.split("+", 1)[0]
+        main, dash, pre = main.partition("-")
+        self.main = [int(item) if item.isdigit() else item for item in main.split(".")]
+        self.pre = pre if dash else None
+        self._key = (_version_items(main), 1 if self.pre is None else 0, _version_items(pre) if pre else ())
+
+    @property
+    def is_prerelease(self):
+        return self.pre is not None
+
+    def __eq__(self, other):
+        other = other if isinstance(other, Version) else Version(other)
+        return self._key == other._key
+
+    def __lt__(self, other):
+        other = other if isinstance(other, Version) else Version(other)
+        return self._key < other._key
+
+    def __le__(self, other):
+        return self == other or self < other
+
+    def __gt__(self, other):
+        return not self <= other
+
+    def __ge__(self, other):
+        return not self < other
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __str__(self):
+        return self.value
+
+    def __repr__(self):
+        return f"Version({self.value!r})"
+
+
+def _bump(version, index):
+    # Lowest pre-release greater than every version starting with main[:index + 1].
+    head = list(Version(version).main[:index + 1])
+    if not head or not isinstance(head[-1], int):
+        return None
+    head[-1] += 1
+    return Version(".".join(map(str, head)) + "-")
+
+
+def _lowest(version):
+    # Like conan, `>=` and `<` bounds without pre-release nor build metadata start at the lowest pre-release,
+    # so `<2` excludes `2-rc` and `>=1.2` includes `1.2-rc` when pre-releases are allowed.
+    return version if "-" in version or "+" in version else version + "-"
+
+
+class VersionRange:
+    """
+       Conan version range expression: `[>=1 <2]`, `[~1.2]`, `[^1.2]`,
+       `[>=1 <2 || >=3]` and `[..., include_prerelease]`.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression.strip()
+        body = self.expression[1:-1] if self.expression.startswith("[") else self.expression
+        body, *flags = [part.strip() for part in body.split(",")]
+        self.include_prerelease = "include_prerelease" in flags
+        self.alternatives = [self._parse_conditions(alt) for alt in body.split("||")]
+
+    @staticmethod
+    def _parse_conditions(alternative):
+        conditions = []
+        for token in alternative.split():
+            if token == "*":
+                continue
+            if token.startswith("~"):
+                base = _lowest(token[1:])
+                depth = 1 if len(Version(base).main) > 1 else 0
+                conditions.append((">=", Version(base)))
+                conditions.append(("<", _bump(base, depth)))
+            elif token.startswith("^"):
+                base = token[1:]
+                main = Version(base).main
+                depth = next((i for i, v in enumerate(main) if v != 0), len(main) - 1)
+                conditions.append((">=", Version(_lowest(base))))
+                conditions.append(("<", _bump(base, depth)))
+            else:
+                match = re.match(r"(>=|<=|>|<|=|!=)?(.+)", token)
+                op, version = match.group(1) or "=", match.group(2)
+                conditions.append((op, Version(_lowest(version) if op in (">=", "<") else version)))
+        return [(op, v) for op, v in conditions if v is not None]
+
+    def contains(self, version):
+        version = version if isinstance(version, Version) else Version(version)
+        if version.is_prerelease and not self.include_prerelease:
+            return False
+        return any(all(_compare(version, op, bound) for op, bound in alt) for alt in self.alternatives)
+
+    def __str__(self):
+        return self.expression
+
+
+def _compare(version, op, bound):
+    return {
+        ">=": version >= bound,
+        "<=": version <= bound,
+        ">": version > bound,
+        "<": version < bound,
+        "=": version == bound,
+        "!=": not version == bound,
+    }[op]
+
+
+class Reference:
+    """
+       A requirement reference `name/version[@user/channel][#rrev]` whose
+       version may be a range.
+    """
+
+    def __init__(self, value):
+        self.value = value.strip()
+        ref = self.value.split("#", 1)[0].split("@", 1)[0]
+        self.name, _, self.version = ref.partition("/")
+        self.range = VersionRange(self.version) if self.version.startswith("[") else None
+
+    def matches(self, version):
+        if self.range is not None:
+            return self.range.contains(version)
+        return Version(self.version) == Version(version)
+
+    def resolve(self, versions):
+        # Conan picks the highest version satisfying the range.
+        candidates = [v for v in versions if self.matches(v)]
+        return max(candidates, key=Version) if candidates else None
+
+    def __str__(self):
+        return self.value
+
+
+################
+# REQUIREMENTS #
+################
+
+class Requirement:
+    def __init__(self, ref, kind, conditions=(), method=None):
+        self.ref = ref
+        self.kind = kind
+        self.conditions = tuple(conditions)
+        self.method = method
+
+    @property
+    def reference(self):
+        return Reference(self.ref)
+
+    def as_dict(self):
+        return {"ref": self.ref, "kind": self.kind, "conditions": list(self.conditions)}
+
+    def __repr__(self):
+        return f"Requirement({self.ref!r}, {self.kind!r}, {self.conditions!r})"
+
+
+class _Unresolved(Exception):
+    pass
+
+
+def _expression(source, node):
+    """Source text of `node` on one line (`ast.unparse` needs python 3.9, the CI runs 3.8)."""
+    return re.sub(r"\s*\n\s*", " ", ast.get_source_segment(source, node))
+
+
+def _describe_condition(test, source, negate=False):
+    """Translate an `if` test on options into `option=value` strings."""
+    if isinstance(test, ast.UnaryOp) and isinstance(test.op, ast.Not):
+        return _describe_condition(test.operand, source, not negate)
+
+    option = _option_name(test)
+    if option is not None:
+        return [f"{option}={not negate}"]
+
+    if isinstance(test, ast.Compare) and len(test.ops) == 1 and isinstance(test.ops[0], (ast.Eq, ast.NotEq)):
+        option = _option_name(test.left)
+        right = test.comparators[0]
+        if option is not None and isinstance(right, ast.Constant):
+            op_is_eq = isinstance(test.ops[0], ast.Eq) != negate
+            return [f"{option}{'=' if op_is_eq else '!='}{right.value}"]
+
+    if isinstance(test, ast.BoolOp) and isinstance(test.op, ast.And) and not negate:
+        return [c for value in test.values for c in _describe_condition(value, source)]
+
+    expression = _expression(source, test)
+    return [f"not ({expression})" if negate else expression]
+
+
+def _option_name(node):
+    # self.options.xxx or self.options.get_safe('xxx')
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Attribute) \
+            and node.value.attr == "options" and isinstance(node.value.value, ast.Name) \
+            and node.value.value.id == "self":
+        return node.attr
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "get_safe" \
+            and isinstance(node.func.value, ast.Attribute) and node.func.value.attr == "options" \
+            and node.args and isinstance(node.args[0], ast.Constant):
+        return node.args[0].value
+    return None
+
+
+class _RequirementCollector:
+    """
+       Evaluate the small subset of python used by recipes to declare their
+       requirements: string literals, f-strings on `self.version` and lookups
+       into `self.conan_data`.
+    """
+
+    def __init__(self, conandata, version, source):
+        self.conandata = conandata
+        self.source = source
+        self.version = version
+        self.requirements = []
+        self.unresolved = []
+
+    def _eval(self, node, scope):
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name) and node.id in scope:
+            return scope[node.id]
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "self":
+            if node.attr == "conan_data":
+                return self.conandata
+            if node.attr == "version":
+                return self.version
+        if isinstance(node, ast.Subscript):
+            container = self._eval(node.value, scope)
+            # python 3.8 wraps the subscript in ast.Index.
+            index = node.slice
+            if sys.version_info < (3, 9) and isinstance(index, ast.Index):
+                index = index.value
+            key = self._eval(index, scope)
+            try:
+                return container[key]
+            except (KeyError, TypeError, IndexError):
+                raise _Unresolved(_expression(self.source, node))
+        if isinstance(node, ast.JoinedStr):
+            parts = []
+            for value in node.values:
+                if isinstance(value, ast.FormattedValue):
+                    parts.append(str(self._eval(value.value, scope)))
+                else:
+                    parts.append(value.value)
+            return "".join(parts)
+        if isinstance(node, (ast.Tuple, ast.List)):
+            return [self._eval(e, scope) for e in node.elts]
+        raise _Unresolved(_expression(self.source, node))
+
+    def _add(self, kind, node, scope, conditions, method):
+        try:
+            value = self._eval(node, scope)
+        except _Unresolved as error:
+            self.unresolved.append((kind, str(error), tuple(conditions)))
+            return
+        for ref in ([value] if isinstance(value, str) else value or []):
+            self.requirements.append(Requirement(ref, kind, conditions, method))
+
+    def visit_body(self, body, scope, conditions, method):
+        for statement in body:
+            self.visit_statement(statement, scope, conditions, method)
+
+    def visit_statement(self, node, scope, conditions, method):
+        if isinstance(node, ast.If):
+            self.visit_body(node.body, scope, conditions + _describe_condition(node.test, self.source), method)
+            self.visit_body(node.orelse, scope, conditions + _describe_condition(node.test, self.source, negate=True), method)
+        elif isinstance(node, (ast.For, ast.While, ast.With, ast.Try)):
+            for block in ("body", "orelse", "finalbody"):
+                self.visit_body(getattr(node, block, []), scope, conditions, method)
+            for handler in getattr(node, "handlers", []):
+                self.visit_body(handler.body, scope, conditions, method)
+        elif isinstance(node, ast.Assign):
+            try:
+                value = self._eval(node.value, scope)
+            except _Unresolved:
+                value = None
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    scope[target.id] = value
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Call):
+            call = node.value
+            if isinstance(call.func, ast.Attribute) and isinstance(call.func.value, ast.Name) \
+                    and call.func.value.id == "self" and call.func.attr in REQUIREMENT_METHODS and call.args:
+                self._add(REQUIREMENT_METHODS[call.func.attr], call.args[0], scope, conditions, method)
+
+    def visit_class(self, node):
+        for statement in node.body:
+            if isinstance(statement, ast.Assign) and len(statement.targets) == 1 \
+                    and isinstance(statement.targets[0], ast.Name) \
+                    and statement.targets[0].id in REQUIREMENT_METHODS:
+                self._add(REQUIREMENT_METHODS[statement.targets[0].id], statement.value, {}, [], None)
+            elif isinstance(statement, ast.FunctionDef):
+                self.visit_body(statement.body, {}, [], statement.name)
+
+
+def _conanfile_class(tree, source):
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            bases = [_expression(source, b) for b in node.bases]
+            if any(b.split(".")[-1] == "ConanFile" for b in bases):
+                return node
+    return None
+
+
+def _class_attribute(class_node, name):
+    """Literal value of a class attribute (`name = 'foo'`, `options = {...}`), or None."""
+    for statement in class_node.body:
+        if isinstance(statement, ast.Assign) and len(statement.targets) == 1 \
+                and isinstance(statement.targets[0], ast.Name) and statement.targets[0].id == name:
+            try:
+                return ast.literal_eval(statement.value)
+            except ValueError:
+                return None
+    return None
+
+
+def _flatten_sources(data, name=None):
+    """
+       Flatten a conandata `sources` entry. Nested mappings are additional
+       archives fetched by the recipe (milk's `image_stream_io`, cpp_redis's
+       `tacopie`) and are reported under their key.
+    """
+    if not isinstance(data, dict):
+        return []
+    sources = []
+    own = {k: v for k, v in data.items() if not isinstance(v, dict)}
+    if "url" in own:
+        sources.append(dict(own, name=name))
+    for key, value in data.items():
+        if isinstance(value, dict):
+            sources.extend(_flatten_sources(value, key))
+    return sources
+
+
+##########
+# RECIPE #
+##########
+
+class RecipeFolder:
+    """A recipe folder (`recipes/<name>/<folder>`) shared by one or more versions."""
+
+    def __init__(self, path):
+        self.path = path
+        conandata_path = os.path.join(path, "conandata.yml")
+        self.conandata = load_yaml(conandata_path) if os.path.isfile(conandata_path) else {}
+        conanfile_path = os.path.join(path, "conanfile.py")
+        with open(conanfile_path, encoding="utf-8") as f:
+            self.source = f.read()
+        self.tree = ast.parse(self.source, filename=conanfile_path)
+        self.conanfile_class = _conanfile_class(self.tree, self.source)
+
+    def attribute(self, name):
+        return _class_attribute(self.conanfile_class, name) if self.conanfile_class else None
+
+    @property
+    def declared_name(self):
+        return self.attribute("name")
+
+    @property
+    def options(self):
+        return self.attribute("options") or {}
+
+    @property
+    def default_options(self):
+        return self.attribute("default_options") or {}
+
+    def sources(self, version):
+        """List of `{name, url, sha256, ...}` archives listed in conandata for `version`."""
+        sources = {str(k): v for k, v in (self.conandata.get("sources") or {}).items()}
+        return _flatten_sources(sources.get(version))
+
+    def patches(self, version):
+        patches = self.conandata.get("patches") or {}
+        # Some recipes (MatX) apply the same patches to every version.
+        if isinstance(patches, list):
+            return patches
+        return {str(k): v for k, v in patches.items()}.get(version) or []
+
+    def requirements(self, version):
+        """
+           Return `(requirements, unresolved)` for `version`. `unresolved` lists
+           the requirement expressions that could not be statically evaluated.
+        """
+        collector = _RequirementCollector(self.conandata, version, self.source)
+        if self.conanfile_class is not None:
+            collector.visit_class(self.conanfile_class)
+        return collector.requirements, collector.unresolved
+
+
+class Recipe:
+    def __init__(self, root, name):
+        self.name = name
+        self.path = os.path.join(root, RECIPES_FOLDER, name)
+        config = load_yaml(os.path.join(self.path, "config.yml"))
+        self.versions = {str(v): str(d["folder"]) for v, d in (config.get("versions") or {}).items()}
+        self._folders = {}
+
+    def folder(self, version):
+        folder = self.versions[version]
+        if folder not in self._folders:
+            self._folders[folder] = RecipeFolder(os.path.join(self.path, folder))
+        return self._folders[folder]
+
+    @property
+    def reference_name(self):
+        """Name used in references, as declared by the recipe (`recipes/MatX` is `matx`)."""
+        for version in self.versions:
+            declared = self.folder(version).declared_name
+            if declared:
+                return declared
+        return self.name
+
+    def versions_in_folder(self, folder):
+        return [v for v, f in self.versions.items() if f == folder]
+
+    def requirements(self, version):
+        return self.folder(version).requirements(version)
+
+
+class RecipeIndex:
+    def __init__(self, root=None):
+        self.root = root or default_root()
+        recipes_path = os.path.join(self.root, RECIPES_FOLDER)
+        self.recipes = {}
+        for name in sorted(os.listdir(recipes_path)):
+            if os.path.isfile(os.path.join(recipes_path, name, "config.yml")):
+                self.recipes[name] = Recipe(self.root, name)
+        self._names = None
+
+    def __iter__(self):
+        return iter(self.recipes.values())
+
+    def __getitem__(self, name):
+        return self.recipes[self.folder_name(name)]
+
+    def __contains__(self, name):
+        return self.folder_name(name) in self.recipes
+
+    def folder_name(self, name):
+        """
+           Map a reference name to its recipe folder. They usually match but
+           some folders use a different case (`recipes/MatX` is `matx`).
+        """
+        if name in self.recipes:
+            return name
+        if self._names is None:
+            self._names = {recipe.reference_name: recipe.name for recipe in self}
+            for recipe in self:
+                self._names.setdefault(recipe.name.lower(), recipe.name)
+        return self._names.get(name, name)
+
+    def nodes(self):
+        """Iterate over every `(recipe, version)` of the index."""
+        for recipe in self:
+            for version in recipe.versions:
+                yield recipe, version
+
+    def changed_from_paths(self, paths):
+        """
+           Map changed file paths (relative to the index root) to the
+           `(name, version)` pairs they affect.
+        """
+        changed = set()
+        for path in paths:
+            parts = os.path.normpath(path).split(os.sep)
+            if len(parts) < 3 or parts[0] != RECIPES_FOLDER or parts[1] not in self.recipes:
+                continue
+            recipe = self.recipes[parts[1]]
+            if parts[2] == "config.yml":
+                changed.update((recipe.name, v) for v in recipe.versions)
+            else:
+                changed.update((recipe.name, v) for v in recipe.versions_in_folder(parts[2]))
+        return changed
@@ -0,0 +1,246 @@
+"""
+Content addressed store of the source archives listed in the conandata files.
+
+Archives are stored as `<store>/<sha256[:2]>/<sha256>/<filename>`, the layout
+read by the `cosmic_base` python-require: once the store is populated and
+`user.cosmic:source_store` points to it, recipes extract their sources from
+it instead of downloading them. The store can live on a shared filesystem,
+files are only added with an atomic rename once verified.
+
+Sources are downloaded concurrently and hashed while they are streamed, so an
+archive is never read back. An interrupted download is kept as `.partial`
+and resumed with an HTTP range request on the next run.
+
+Usage:
+    python3 tools/source_mirror.py --store /shared/cosmic-sources populate -j 8
+    python3 tools/source_mirror.py --store /shared/cosmic-sources populate milk cpp_redis
+    python3 tools/source_mirror.py --store /shared/cosmic-sources status
+    # Check every conandata sha256 against its url, without storing anything.
+    python3 tools/source_mirror.py verify -j 16
+"""
+
+import argparse
+import fcntl
+import hashlib
+import http.client
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from recipe_index import RecipeIndex, default_root
+
+
+CHUNK_SIZE = 1 << 20
+
+
+class FetchResult:
+    def __init__(self, sha256, source, refs, status, size=0, error=None):
+        self.sha256 = sha256
+        self.source = source
+        self.refs = refs
+        # present, stored, resumed, match, mismatch, busy or error
+        self.status = status
+        self.size = size
+        self.error = error
+
+    @property
+    def failed(self):
+        return self.status in ("mismatch", "error")
+
+
+def store_path(store, sha256, filename):
+    # Keep in sync with recipes/cosmic_base/all/sources.py
+    return os.path.join(store, sha256[:2], sha256, filename)
+
+
+def source_urls(source):
+    url = source["url"]
+    return list(url) if isinstance(url, (list, tuple)) else [url]
+
+
+def source_filename(source):
+    return os.path.basename(source_urls(source)[0].split("?", 1)[0])
+
+
+def index_sources(index, names=None):
+    """
+       Unique `(sha256, source, refs)` of the sources of the index, optionally
+       restricted to some recipes. Sources without sha256 cannot be stored.
+    """
+    sources = {}
+    for recipe, version in index.nodes():
+        if names and recipe.name not in names and recipe.reference_name not in names:
+            continue
+        for source in recipe.folder(version).sources(version):
+            if "sha256" not in source:
+                print(f"warning: {recipe.name}/{version}: {source_urls(source)[0]} has no sha256, skipped", file=sys.stderr)
+                continue
+            entry = sources.setdefault(source["sha256"], (source, []))
+            entry[1].append(f"{recipe.name}/{version}")
+    return [(sha256, source, refs) for sha256, (source, refs) in sorted(sources.items())]
+
+
+def _open(url, offset=0, timeout=60):
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout)
+
+
+def _copy(stream, sha, f=None):
+    size = 0
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        sha.update(chunk)
+        if f is not None:
+            f.write(chunk)
+        size += len(chunk)
+    return size
+
+
+def _receive(response, sha, f=None):
+    """
+       Copy the body of `response`. urllib returns a short body when the
+       server drops the connection: it is raised as an error, like the
+       `IncompleteRead` of chunked responses, instead of being hashed as is.
+    """
+    size = _copy(response, sha, f)
+    length = response.headers.get("Content-Length")
+    if length is not None and size < int(length):
+        raise ConnectionError(f"connection closed after {size} of {length} bytes")
+    return size
+
+
+def verify_source(sha256, source, refs, timeout=60):
+    """Stream the first reachable url of `source` through sha256 without storing it."""
+    errors = []
+    for url in source_urls(source):
+        sha = hashlib.sha256()
+        try:
+            with _open(url, timeout=timeout) as response:
+                size = _receive(response, sha)
+        except (OSError, http.client.HTTPException) as error:
+            errors.append(f"{url}: {error}")
+            continue
+        if sha.hexdigest() != sha256:
+            return FetchResult(sha256, source, refs, "mismatch", size, f"{url}: got {sha.hexdigest()}")
+        return FetchResult(sha256, source, refs, "match", size)
+    return FetchResult(sha256, source, refs, "error", error="; ".join(errors))
+
+
+def download_to_store(store, sha256, source, refs=(), timeout=60):
+    """
+       Download `source` into the store, resuming `<path>.partial` when the
+       server supports range requests. The partial file is locked so that
+       runners sharing the store never write the same archive concurrently.
+    """
+    path = store_path(store, sha256, source_filename(source))
+    if os.path.isfile(path):
+        return FetchResult(sha256, source, refs, "present")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.partial"
+    errors = []
+    with open(partial, "ab+") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return FetchResult(sha256, source, refs, "busy", error="downloaded by another process")
+
+        for url in source_urls(source):
+            sha = hashlib.sha256()
+            offset = f.seek(0, os.SEEK_END)
+            try:
+                response = _open(url, offset, timeout)
+            except urllib.error.HTTPError as error:
+                if error.code != 416 or not offset:
+                    errors.append(f"{url}: {error}")
+                    continue
+                # Range not satisfiable: the partial file is already complete.
+                response = None
+            except (OSError, http.client.HTTPException) as error:
+                errors.append(f"{url}: {error}")
+                continue
+
+            resumed = bool(offset) and (response is None or response.status == 206)
+            received = 0
+            try:
+                # The part received by a previous run is hashed once, then the rest is streamed.
+                if resumed:
+                    f.seek(0)
+                    _copy(f, sha)
+                else:
+                    f.truncate(0)
+                if response is not None:
+                    with response:
+                        received = _receive(response, sha, f)
+            except (OSError, http.client.HTTPException) as error:
+                # Keep what was received for the next attempt.
+                f.flush()
+                errors.append(f"{url}: {error}")
+                continue
+
+            if sha.hexdigest() != sha256:
+                f.truncate(0)
+                errors.append(f"{url}: sha256 mismatch, got {sha.hexdigest()}")
+                continue
+
+            f.flush()
+            os.replace(partial, path)
+            return FetchResult(sha256, source, refs, "resumed" if resumed else "stored", received)
+
+    if not os.path.getsize(partial):
+        os.remove(partial)
+    status = "mismatch" if errors and all("mismatch" in e for e in errors) else "error"
+    return FetchResult(sha256, source, refs, status, error="; ".join(errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the content addressed store of the index sources.")
+    parser.add_argument("--root", default=default_root(), help="root of the index (default: %(default)s).")
+    parser.add_argument("--store", help="root of the source store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    populate_parser = subparsers.add_parser("populate", help="download the missing sources into the store.")
+    status_parser = subparsers.add_parser("status", help="list the sources missing from the store.")
+    verify_parser = subparsers.add_parser("verify", help="check the conandata sha256 of every source against its url.")
+    for subparser in (populate_parser, status_parser, verify_parser):
+        subparser.add_argument("recipes", nargs="*", help="only these recipes (default: all).")
+    for subparser in (populate_parser, verify_parser):
+        subparser.add_argument("-j", "--jobs", type=int, default=4, help="parallel downloads (default: %(default)s).")
+        subparser.add_argument("--timeout", type=float, default=60, help="network timeout in seconds (default: %(default)s).")
+
+    args = parser.parse_args()
+    if args.command != "verify" and not args.store:
+        parser.error(f"--store is required by the `{args.command}` command")
+
+    sources = index_sources(RecipeIndex(args.root), set(args.recipes))
+
+    if args.command == "status":
+        for sha256, source, refs in sources:
+            path = store_path(args.store, sha256, source_filename(source))
+            print(f"{'present' if os.path.isfile(path) else 'missing'}  {sha256}  {', '.join(refs)}")
+        return
+
+    start = time.perf_counter()
+    results = []
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        if args.command == "populate":
+            futures = [executor.submit(download_to_store, args.store, *s, timeout=args.timeout) for s in sources]
+        else:
+            futures = [executor.submit(verify_source, *s, timeout=args.timeout) for s in sources]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"{result.status:<8}  {result.sha256}  {', '.join(result.refs)}"
+                  + (f"  ({result.error})" if result.error else ""), file=sys.stderr if result.failed else sys.stdout)
+
+    elapsed = time.perf_counter() - start
+    failed = [r for r in results if r.failed]
+    transferred = sum(r.size for r in results)
+    print(f"{len(results)} source(s), {len(failed)} failure(s), {transferred / 1e6:.1f} MB in {elapsed:.1f} s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
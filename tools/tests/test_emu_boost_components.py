@@ -0,0 +1,82 @@
+"""
+Check of the compiled Boost libraries used by the emu sources (`_check_boost_components` of the emu recipe).
+
+    python3 -m unittest discover -s tools/tests
+"""
+
+import importlib.util
+import os
+import tempfile
+import types
+import unittest
+
+try:
+    from conan.errors import ConanException
+except ImportError:
+    ConanException = None
+
+RECIPE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "recipes", "emu", "all", "conanfile.py")
+
+
+def _load_recipe():
+    spec = importlib.util.spec_from_file_location("emu_conanfile", RECIPE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.EmuConan
+
+
+@unittest.skipIf(ConanException is None, "conan is not installed")
+class BoostComponentsTest(unittest.TestCase):
+    def setUp(self):
+        self.recipe = _load_recipe()
+        self.sources = tempfile.TemporaryDirectory()
+        self.addCleanup(self.sources.cleanup)
+
+    def _write(self, path, content):
+        path = os.path.join(self.sources.name, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def _check(self, components=()):
+        self.messages = []
+        conanfile = types.SimpleNamespace(source_folder=self.sources.name,
+                                          _boost_components=None if components is None else list(components),
+                                          _boost_libraries=self.recipe._boost_libraries,
+                                          output=types.SimpleNamespace(info=self.messages.append))
+        self.recipe._check_boost_components(conanfile)
+
+    def test_header_only(self):
+        self._write("include/core/emu/a.hpp", "#include <boost/preprocessor.hpp>\n#include <boost/mp11.hpp>\n")
+        self._check()
+
+    def test_undeclared(self):
+        self._write("include/core/emu/a.hpp", "#include <boost/regex.hpp>\n")
+        self._write("src/core/b.cpp", '#  include "boost/date_time/posix_time/posix_time.hpp"\n')
+        self._write("src/core/c.cpp", "#include <boost/system/error_code.hpp>\n#include <boost/exception_ptr.hpp>\n")
+        self._write("src/core/d.cpp", "#include <boost/system.hpp>\n")
+        with self.assertRaises(ConanException) as context:
+            self._check()
+        message = str(context.exception)
+        for library in ("date_time (src/core/b.cpp)", "exception (src/core/c.cpp)", "regex (include/core/emu/a.hpp)"):
+            self.assertIn(library, message)
+        # Header-only since Boost 1.69.
+        self.assertNotIn("system", message)
+
+    def test_declared(self):
+        self._write("src/core/b.cpp", "#include <boost/date_time.hpp>\n#include <boost/regex/v5/regex.hpp>\n")
+        self._check(["date_time", "regex"])
+
+    def test_tests_not_checked(self):
+        self._write("test/core/t.cpp", "#include <boost/filesystem.hpp>\n")
+        self._check()
+
+    def test_unknown_components_are_reported(self):
+        self._write("src/core/b.cpp", "#include <boost/date_time.hpp>\n#include <boost/regex.hpp>\n")
+        self._check(None)
+        self.assertEqual(self.messages, ["emu uses the compiled Boost libraries: date_time (src/core/b.cpp), "
+                                         "regex (src/core/b.cpp)"])
+
+
+if __name__ == "__main__":
+    unittest.main()
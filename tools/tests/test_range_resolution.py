@@ -0,0 +1,76 @@
+"""
+Version ranges of recipe_index.py, compared to conan's resolution, and lockfiles of range_resolution.py.
+
+    python3 -m unittest discover -s tools/tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from range_resolution import lockfile  # noqa: E402
+from recipe_index import Reference, Version, VersionRange  # noqa: E402
+
+
+class VersionRangeTest(unittest.TestCase):
+    def _assert_contains(self, expression, included, excluded):
+        version_range = VersionRange(expression)
+        for version in included:
+            self.assertTrue(version_range.contains(version), f"{version} in {expression}")
+        for version in excluded:
+            self.assertFalse(version_range.contains(version), f"{version} not in {expression}")
+
+    def test_bound_is_lowest_prerelease(self):
+        self.assertTrue(Version("2-").is_prerelease)
+        self.assertLess(Version("1.9.9"), Version("2-"))
+        self.assertLess(Version("2-"), Version("2-a"))
+        self.assertLess(Version("2-a"), Version("2"))
+
+    def test_prereleases_near_the_bounds(self):
+        # Expected values are the ones of conan 2.
+        self._assert_contains("[>=1 <2, include_prerelease]", ["1-rc", "1", "1.9", "1.9.9-rc"], ["0.9", "2-", "2-pre", "2"])
+        self._assert_contains("[<2, include_prerelease]", ["1.9", "1.9-rc"], ["2-pre", "2"])
+        self._assert_contains("[~1.2, include_prerelease]", ["1.2-rc", "1.2", "1.2.9"], ["1.3-", "1.3-pre", "1.3"])
+        self._assert_contains("[^1.2, include_prerelease]", ["1.2-rc", "1.3-pre", "1.9"], ["1.1", "2-pre", "2"])
+        self._assert_contains("[>1 <=2, include_prerelease]", ["1.0.1-rc", "2-pre", "2"], ["1", "2.0.1"])
+
+    def test_prereleases_excluded(self):
+        self._assert_contains("[>=1 <2]", ["1", "1.9"], ["1-rc", "1.9.9-rc", "2"])
+        self._assert_contains("[~1.2]", ["1.2", "1.2.9"], ["1.2-rc", "1.3"])
+
+    def test_resolve(self):
+        versions = ["1.9", "2-rc", "2.0", "3"]
+        self.assertEqual(Reference("pkg/[>=1 <2, include_prerelease]").resolve(versions), "1.9")
+        self.assertEqual(Reference("pkg/[^2-, include_prerelease]").resolve(versions), "2.0")
+
+
+class LockfileTest(unittest.TestCase):
+    TABLE = {
+        "ranges": {
+            "boost/[>=1.80 <2]": {"ref": "boost/1.86.0", "revision": "b1", "timestamp": 10, "kinds": ["requires"]},
+            "cmake/[>=3.23 <4]": {"ref": "cmake/3.30.0", "kinds": ["tool_requires"]},
+        },
+    }
+
+    def test_without_seed(self):
+        lock = lockfile(self.TABLE)
+        self.assertEqual(lock["requires"], ["boost/1.86.0#b1%10"])
+        self.assertEqual(lock["build_requires"], ["cmake/3.30.0"])
+
+    def test_seed_locks_the_external_requirements(self):
+        seed = {
+            "version": "0.5",
+            "requires": ["zlib/1.3.1#z1%5", "bzip2/1.0.8#b2%4", "boost/1.86.0#old%1"],
+            "build_requires": ["b2/5.2.1#b3%3"],
+            "python_requires": [],
+        }
+        lock = lockfile(self.TABLE, seed)
+        # The table entry replaces the seed one for the same reference.
+        self.assertEqual(lock["requires"], ["zlib/1.3.1#z1%5", "bzip2/1.0.8#b2%4", "boost/1.86.0#b1%10"])
+        self.assertEqual(lock["build_requires"], ["cmake/3.30.0", "b2/5.2.1#b3%3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
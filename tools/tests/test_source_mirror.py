@@ -0,0 +1,144 @@
+"""
+Downloads of source_mirror.py against a local HTTP server.
+
+    python3 -m unittest discover -s tools/tests
+"""
+
+import hashlib
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from source_mirror import download_to_store, store_path, verify_source  # noqa: E402
+
+
+PAYLOAD = bytes(range(256)) * 4096
+SHA256 = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    # Set by the tests: honour Range requests, or send only half of the body then close the connection.
+    ranges = True
+    truncate = False
+
+    def do_GET(self):
+        offset = 0
+        header = self.headers.get("Range")
+        self.server.requests.append(header)
+        if self.ranges and header:
+            offset = int(header[len("bytes="):].rstrip("-"))
+            if offset >= len(PAYLOAD):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(PAYLOAD)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {offset}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}")
+        else:
+            self.send_response(200)
+        body = PAYLOAD[offset:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.truncate:
+            body = body[:len(body) // 2]
+            self.close_connection = True
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ServerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        _Handler.ranges, _Handler.truncate = True, False
+
+        self.store = tempfile.TemporaryDirectory()
+        self.addCleanup(self.store.cleanup)
+        self.source = {"url": f"http://127.0.0.1:{self.server.server_port}/archive.tar.gz", "sha256": SHA256}
+        self.path = store_path(self.store.name, SHA256, "archive.tar.gz")
+        self.partial = f"{self.path}.partial"
+
+    def _write_partial(self, data):
+        os.makedirs(os.path.dirname(self.partial), exist_ok=True)
+        with open(self.partial, "wb") as f:
+            f.write(data)
+
+
+class DownloadToStoreTest(_ServerTestCase):
+    def _assert_stored(self):
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), PAYLOAD)
+        self.assertFalse(os.path.exists(self.partial))
+
+    def test_download(self):
+        result = download_to_store(self.store.name, SHA256, self.source)
+        self.assertEqual((result.status, result.size), ("stored", len(PAYLOAD)))
+        self._assert_stored()
+        self.assertEqual(download_to_store(self.store.name, SHA256, self.source).status, "present")
+
+    def test_resume(self):
+        self._write_partial(PAYLOAD[:1000])
+        result = download_to_store(self.store.name, SHA256, self.source)
+        self.assertEqual((result.status, result.size), ("resumed", len(PAYLOAD) - 1000))
+        self.assertEqual(self.server.requests, ["bytes=1000-"])
+        self._assert_stored()
+
+    def test_resume_without_range_support(self):
+        _Handler.ranges = False
+        self._write_partial(PAYLOAD[:1000])
+        result = download_to_store(self.store.name, SHA256, self.source)
+        self.assertEqual((result.status, result.size), ("stored", len(PAYLOAD)))
+        self._assert_stored()
+
+    def test_partial_already_complete(self):
+        self._write_partial(PAYLOAD)
+        result = download_to_store(self.store.name, SHA256, self.source)
+        self.assertEqual((result.status, result.size), ("resumed", 0))
+        self._assert_stored()
+
+    def test_truncated_is_resumed(self):
+        _Handler.truncate = True
+        result = download_to_store(self.store.name, SHA256, self.source)
+        self.assertEqual(result.status, "error")
+        self.assertIn("connection closed", result.error)
+        with open(self.partial, "rb") as f:
+            self.assertEqual(f.read(), PAYLOAD[:len(PAYLOAD) // 2])
+
+        _Handler.truncate = False
+        result = download_to_store(self.store.name, SHA256, self.source)
+        self.assertEqual(result.status, "resumed")
+        self.assertEqual(self.server.requests[-1], f"bytes={len(PAYLOAD) // 2}-")
+        self._assert_stored()
+
+    def test_mismatch(self):
+        sha256 = "0" * 64
+        result = download_to_store(self.store.name, sha256, self.source)
+        self.assertEqual(result.status, "mismatch")
+        path = store_path(self.store.name, sha256, "archive.tar.gz")
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(f"{path}.partial"))
+
+
+class VerifySourceTest(_ServerTestCase):
+    def test_verify(self):
+        self.assertEqual(verify_source(SHA256, self.source, []).status, "match")
+        self.assertEqual(verify_source("0" * 64, self.source, []).status, "mismatch")
+
+    def test_verify_truncated(self):
+        _Handler.truncate = True
+        self.assertEqual(verify_source(SHA256, self.source, []).status, "error")
+
+
+if __name__ == "__main__":
+    unittest.main()